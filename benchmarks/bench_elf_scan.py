@@ -0,0 +1,91 @@
+"""Compare the readelf scan with the in-process ELF parser.
+
+The wheels are filled with real shared objects from the host (any directory
+passed with --lib-dir), so both paths parse genuine dynamic sections.
+
+example:
+  python3 benchmarks/bench_elf_scan.py --wheels 40 --libs-per-wheel 20
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import get_wheel_lib_dep  # noqa: E402
+import wheel_inspect  # noqa: E402
+from synth import PLATFORMS, wheel_filename  # noqa: E402
+
+
+def host_libraries(lib_dir: Path, limit: int, max_size: int) -> list[Path]:
+    libs = []
+    for path in sorted(lib_dir.glob("*.so*")):
+        if path.is_file() and not path.is_symlink() and path.stat().st_size <= max_size:
+            if wheel_inspect.parse_elf_dynamic(path.read_bytes()):
+                libs.append(path)
+        if len(libs) >= limit:
+            break
+    return libs
+
+
+def write_corpus(root: Path, libs: list[Path], wheels: int, per_wheel: int) -> None:
+    root.mkdir()
+    for i in range(wheels):
+        name = f"pkg{i:04d}"
+        path = root / wheel_filename(name, "1.0", PLATFORMS[i % len(PLATFORMS)])
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+            for j in range(per_wheel):
+                lib = libs[(i * per_wheel + j) % len(libs)]
+                zf.write(lib, f"{name}/lib{j:03d}_{lib.name.split('.so')[0]}.so")
+            zf.writestr(f"{name}-1.0.dist-info/METADATA", f"Name: {name}\nVersion: 1.0\n")
+
+
+def timed(wheel_dir: Path, jobs: int, use_readelf: bool):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        summary = get_wheel_lib_dep.process_wheels(str(wheel_dir), jobs, use_readelf)
+    return time.perf_counter() - start, summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--wheels", type=int, default=40, help="Number of wheels (default: 40)")
+    parser.add_argument("--libs-per-wheel", type=int, default=20, help="Shared objects per wheel (default: 20)")
+    parser.add_argument("--lib-dir", type=Path, default=Path("/usr/lib/x86_64-linux-gnu"))
+    parser.add_argument(
+        "--max-lib-size",
+        type=int,
+        default=2 * 1024 * 1024,
+        help="Skip host libraries larger than this many bytes (default: 2 MiB)",
+    )
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    libs = host_libraries(args.lib_dir, 200, args.max_lib_size)
+    if not libs:
+        raise SystemExit(f"No shared objects found in {args.lib_dir}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        wheel_dir = Path(tmp) / "wheels"
+        write_corpus(wheel_dir, libs, args.wheels, args.libs_per_wheel)
+        print(f"{args.wheels} wheels x {args.libs_per_wheel} libraries")
+
+        readelf_time, readelf_summary = timed(wheel_dir, 1, use_readelf=True)
+        print(f"readelf, serial:     {readelf_time:.2f}s")
+        for jobs in sorted({1, args.jobs}):
+            elapsed, summary = timed(wheel_dir, jobs, use_readelf=False)
+            print(f"in-process, jobs={jobs}: {elapsed:.2f}s ({readelf_time / elapsed:.1f}x)")
+            if summary != readelf_summary:
+                raise SystemExit("in-process results differ from readelf")
+        print("results identical: True")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Compare serial and threaded gen_pip_index.py runs on synthetic wheels.
+
+example:
+  python3 benchmarks/bench_index_jobs.py --wheels 400 --jobs 8
+"""
+
+import argparse
+import contextlib
+import hashlib
+import io
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import gen_pip_index  # noqa: E402
+from synth import write_wheel_dir  # noqa: E402
+
+
+def tree_digest(root: Path) -> str:
+    """Hash every generated page so the two runs can be compared."""
+    hasher = hashlib.sha256()
+    for path in sorted(root.rglob("*")):
+        if path.is_file() and path.name != gen_pip_index.MANIFEST_NAME:
+            hasher.update(str(path.relative_to(root)).encode())
+            hasher.update(path.read_bytes())
+    return hasher.hexdigest()
+
+
+def timed_run(wheel_root: Path, out_root: Path, jobs: int) -> float:
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        gen_pip_index.main(wheel_root, "https://example.invalid/dl", out_root, full=True, jobs=jobs)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--wheels", type=int, default=400, help="Number of wheels (default: 400)")
+    parser.add_argument("--members", type=int, default=200, help="Members per wheel (default: 200)")
+    parser.add_argument("--member-size", type=int, default=8192, help="Bytes per member (default: 8192)")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="Threads for the parallel run")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        print(f"Writing {args.wheels} wheels ...")
+        wheels = write_wheel_dir(tmp / "wheels", args.wheels, args.members, args.member_size)
+        total = sum(w.stat().st_size for w in wheels)
+        print(f"Corpus: {total / 1e6:.1f} MB")
+
+        serial = timed_run(tmp / "wheels", tmp / "serial", 1)
+        parallel = timed_run(tmp / "wheels", tmp / "parallel", args.jobs)
+
+        same = tree_digest(tmp / "serial") == tree_digest(tmp / "parallel")
+        print(f"serial:    {serial:.2f}s")
+        print(f"--jobs {args.jobs}: {parallel:.2f}s ({serial / parallel:.2f}x)")
+        print(f"output identical: {same}")
+        if not same:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
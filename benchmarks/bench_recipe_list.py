@@ -0,0 +1,68 @@
+"""Compare recipe_list.py's AST scanner with importing every recipe.
+
+Each variant runs in a fresh interpreter, since imported recipe modules stay
+cached in sys.modules. Needs pythonforandroid importable.
+
+example:
+  python3 benchmarks/bench_recipe_list.py --repeat 5
+"""
+
+import argparse
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SCRIPT = Path(__file__).resolve().parent.parent / "recipe_list.py"
+
+
+def run(args: list[str], cache_dir: Path) -> tuple[float, str]:
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, str(SCRIPT), "--cache-dir", str(cache_dir), *args],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return time.perf_counter() - start, result.stdout
+
+
+def listed(output: str) -> list[str]:
+    return [line[2:].split(" → ")[0] for line in output.splitlines() if line.startswith("- ")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per variant, best is kept (default: 5)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_dir = Path(tmp)
+        variants = (
+            ("import", ["--import"]),
+            ("ast, no cache", ["--no-cache"]),
+            ("ast, cached", []),
+        )
+        run([], cache_dir)  # fill the cache for the "cached" variant
+        results = {}
+        outputs = {}
+        for label, flags in variants:
+            times = []
+            for _ in range(args.repeat):
+                elapsed, outputs[label] = run(flags, cache_dir)
+                times.append(elapsed)
+            results[label] = min(times)
+            print(f"{label:>14}: {results[label] * 1000:8.1f} ms  ({len(listed(outputs[label]))} recipes)")
+
+        for label in ("ast, no cache", "ast, cached"):
+            print(f"{'speedup':>14}: {results['import'] / results[label]:8.1f}x ({label})")
+        only_import = set(listed(outputs["import"])) - set(listed(outputs["ast, cached"]))
+        only_ast = set(listed(outputs["ast, cached"])) - set(listed(outputs["import"]))
+        if only_import or only_ast:
+            print(f"only with --import: {sorted(only_import)}")
+            print(f"only with the scanner: {sorted(only_ast)}")
+
+
+if __name__ == "__main__":
+    main()
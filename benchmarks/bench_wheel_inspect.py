@@ -0,0 +1,77 @@
+"""Compare the single-pass wheel inspection with separate METADATA and hash reads.
+
+example:
+  python3 benchmarks/bench_wheel_inspect.py --members 30000
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+import tracemalloc
+import zipfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from synth import wheel_filename, write_wheel  # noqa: E402
+from wheel_hashes import sha256_file  # noqa: E402
+from wheel_inspect import inspect_wheel  # noqa: E402
+
+
+def two_passes(path: Path) -> tuple[bytes | None, str]:
+    """What indexing did before wheel_inspect: read METADATA, then hash the file."""
+    with zipfile.ZipFile(path) as zf:
+        metadata = next(
+            (zf.read(name) for name in zf.namelist() if name.endswith(".dist-info/METADATA")),
+            None,
+        )
+    return metadata, sha256_file(path)
+
+
+def single_pass(path: Path) -> tuple[bytes | None, str]:
+    inspected = inspect_wheel(path)
+    return inspected["metadata"], inspected["sha256"]
+
+
+def measure(func, path: Path, repeat: int) -> tuple[float, int]:
+    """Return (mean seconds per call, peak traced bytes of a single call)."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(path)
+    elapsed = (time.perf_counter() - start) / repeat
+
+    tracemalloc.start()
+    func(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--members", type=int, default=30000, help="Members in the wheel (default: 30000)")
+    parser.add_argument("--member-size", type=int, default=4096, help="Bytes per member (default: 4096)")
+    parser.add_argument("--libs", type=int, default=4, help="ELF libraries in the wheel (default: 4)")
+    parser.add_argument("--repeat", type=int, default=5, help="Calls per measurement (default: 5)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / wheel_filename("bigpkg", "1.0", "android_24_arm64_v8a")
+        write_wheel(path, "bigpkg", "1.0", members=args.members, member_size=args.member_size, libs=args.libs)
+        assert two_passes(path) == single_pass(path)
+
+        print(f"{args.members} members, {path.stat().st_size / 1e6:.1f} MB")
+        results = {}
+        for label, func in (("two passes", two_passes), ("inspect_wheel", single_pass)):
+            results[label] = measure(func, path, args.repeat)
+            elapsed, peak = results[label]
+            print(f"{label:>14}: {elapsed * 1000:8.2f} ms  peak {peak / 1024:9.1f} KiB")
+
+        old_time, old_peak = results["two passes"]
+        new_time, new_peak = results["inspect_wheel"]
+        print(f"{'speedup':>14}: {old_time / new_time:8.1f}x  memory {old_peak / new_peak:.1f}x less")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""Time the index, scan and release tools on a synthetic corpus.
+
+Every tool runs as its own process, so the numbers include interpreter
+start-up and peak RSS comes straight from wait4(). Results are compared
+with a stored baseline and the run fails when one is slower or larger than
+the tolerance allows.
+
+example:
+  python3 benchmarks/run.py --wheels 400 --update-baseline   # record
+  python3 benchmarks/run.py --wheels 400                     # compare
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import wheel_hashes  # noqa: E402
+from synth import write_wheel_dir  # noqa: E402
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baseline.json"
+
+# Answers the three calls GhBackend.list_assets makes. Every corpus wheel is
+# reported with a wrong digest, so release.py hashes and diffs all of them.
+GH_STUB = '''#!{python}
+import json, sys
+from pathlib import Path
+args = sys.argv[1:]
+if args[:2] == ["repo", "view"]:
+    print("bench/corpus")
+elif args[:2] == ["api", "--paginate"]:
+    for path in sorted(Path({corpus!r}).glob("*.whl")):
+        print(json.dumps({{"name": path.name, "digest": "sha256:0"}}))
+elif args[:1] == ["api"]:
+    print(json.dumps({{"id": 1}}))
+else:
+    sys.exit(f"gh stub: unexpected call {{args}}")
+'''
+
+
+def measure(cmd: list[str], repeat: int, setup=None) -> dict:
+    """Best wall time and highest peak RSS over ``repeat`` runs of ``cmd``.
+
+    ``setup`` runs before every repetition, untimed.
+    """
+    seconds = []
+    max_rss_kb = 0
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        proc = subprocess.Popen(cmd, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        stderr = proc.stderr.read()
+        _, status, usage = os.wait4(proc.pid, 0)
+        seconds.append(time.perf_counter() - start)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        if proc.returncode != 0:
+            raise SystemExit(f"{' '.join(cmd)} exited with {proc.returncode}:\n{stderr.decode(errors='replace')}")
+        max_rss_kb = max(max_rss_kb, usage.ru_maxrss)
+    return {"seconds": round(min(seconds), 4), "max_rss_kb": max_rss_kb}
+
+
+def benchmarks(corpus: Path, work: Path, jobs: int) -> dict[str, tuple]:
+    """name -> (command, setup); run in order, so warm runs follow cold ones."""
+    py = sys.executable
+    gh = work / "gh"
+    gh.write_text(GH_STUB.format(python=py, corpus=str(corpus)))
+    gh.chmod(0o755)
+    index_out = work / "index"
+    scan_cache = work / "scan-cache"
+    index = [py, "gen_pip_index.py", str(corpus), ".", str(index_out), "-j", str(jobs)]
+    scan = [py, "get_wheel_lib_dep.py", str(corpus), "-j", str(jobs), "--cache-dir", str(scan_cache)]
+    release = [py, "release.py", "bench", str(corpus), "--dry-run", "--gh", str(gh), "-j", str(jobs)]
+    return {
+        "gen_pip_index.full": (index + ["--full"], None),
+        "gen_pip_index.unchanged": (index, None),
+        "gen_pip_index.scan_libs": (
+            index + ["--full", "--scan-libs", "--cache-dir", str(work / "index-scan-cache")],
+            lambda: shutil.rmtree(work / "index-scan-cache", ignore_errors=True),
+        ),
+        "get_wheel_lib_dep.no_cache": (scan + ["--no-cache"], None),
+        "get_wheel_lib_dep.cold": (scan, lambda: shutil.rmtree(scan_cache, ignore_errors=True)),
+        "get_wheel_lib_dep.warm": (scan, None),
+        "release.verify": (release + ["--verify"], None),
+        "release.reuse": (release, None),
+    }
+
+
+def compare(results: dict, baseline: dict, time_tolerance: float, memory_tolerance: float) -> list[str]:
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if result["seconds"] > base["seconds"] * (1 + time_tolerance):
+            regressions.append(f"{name}: {base['seconds']:.3f}s -> {result['seconds']:.3f}s")
+        if result["max_rss_kb"] > base["max_rss_kb"] * (1 + memory_tolerance):
+            regressions.append(f"{name}: {base['max_rss_kb'] / 1024:.1f} MB -> {result['max_rss_kb'] / 1024:.1f} MB peak RSS")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the wheel tools and compare with a baseline.")
+    parser.add_argument("--corpus", type=Path, help="Reuse (or create) the corpus here instead of a temporary one.")
+    parser.add_argument("--wheels", type=int, default=200, help="Wheels in a new corpus (default: 200)")
+    parser.add_argument("--members", type=int, default=200, help="Payload files per wheel (default: 200)")
+    parser.add_argument("--member-size", type=int, default=4096, help="Bytes per payload file (default: 4096)")
+    parser.add_argument("--libs", type=int, default=4, help="ELF shared objects per wheel (default: 4)")
+    parser.add_argument("--lib-size", type=int, default=65536, help="Bytes per shared object (default: 65536)")
+    # Fixed rather than the CPU count: it is part of the corpus key in the baseline.
+    parser.add_argument("-j", "--jobs", type=int, default=4, help="--jobs passed to every tool (default: 4)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per benchmark; the fastest counts (default: 3)")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE, help="Baseline JSON (default: %(default)s)")
+    parser.add_argument("--update-baseline", action="store_true", help="Write the results as the new baseline.")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown as a fraction (default: 0.25)")
+    parser.add_argument("--memory-tolerance", type=float, default=0.25, help="Allowed peak RSS growth as a fraction (default: 0.25)")
+    args = parser.parse_args()
+
+    corpus_params = {
+        "wheels": args.wheels,
+        "members": args.members,
+        "member_size": args.member_size,
+        "libs": args.libs,
+        "lib_size": args.lib_size,
+        "jobs": args.jobs,
+    }
+    baseline = None
+    if not args.update_baseline:
+        # Checked first: without a usable baseline there is nothing to gate on.
+        if not args.baseline.exists():
+            raise SystemExit(f"No baseline at {args.baseline}; run with --update-baseline to record one")
+        baseline = json.loads(args.baseline.read_text())
+        if baseline.get("corpus") != corpus_params:
+            raise SystemExit(f"Baseline was recorded for {baseline.get('corpus')}, not {corpus_params}")
+    with tempfile.TemporaryDirectory() as tmp:
+        work = Path(tmp)
+        corpus = args.corpus or work / "corpus"
+        if not any(corpus.glob("*.whl")):
+            write_wheel_dir(corpus, args.wheels, args.members, args.member_size, args.libs, args.lib_size)
+        # sidecars from an earlier run would turn cold runs warm
+        for stale in ("*.whl.metadata", wheel_hashes.HASHES_NAME):
+            for path in corpus.glob(stale):
+                path.unlink()
+        size = sum(p.stat().st_size for p in corpus.glob("*.whl"))
+        print(f"Corpus: {len(list(corpus.glob('*.whl')))} wheels, {size / 1e6:.1f} MB")
+
+        results = {}
+        for name, (cmd, setup) in benchmarks(corpus, work, args.jobs).items():
+            results[name] = measure(cmd, args.repeat, setup)
+            r = results[name]
+            print(f"{name:30} {r['seconds']:8.3f}s {r['max_rss_kb'] / 1024:8.1f} MB")
+
+    if args.update_baseline:
+        args.baseline.write_text(json.dumps({"corpus": corpus_params, "results": results}, indent=2) + "\n")
+        print(f"Baseline written to {args.baseline}")
+        return
+    regressions = compare(results, baseline["results"], args.tolerance, args.memory_tolerance)
+    if regressions:
+        print("Regressions:")
+        for line in regressions:
+            print(f"  {line}")
+        raise SystemExit(1)
+    print("No regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""Helpers for writing synthetic Android wheels used by the benchmarks.
+
+Run directly to write a corpus:
+  python3 benchmarks/synth.py /tmp/corpus --wheels 400 --members 300 --libs 4
+"""
+
+import argparse
+import random
+import struct
+import zipfile
+from pathlib import Path
+
+PLATFORMS = (
+    "android_24_arm64_v8a",
+    "android_24_arm",
+    "android_24_i686",
+    "android_24_x86_64",
+)
+# (ELF class, e_machine) per platform tag: EM_AARCH64, EM_ARM, EM_386, EM_X86_64
+PLATFORM_ELF = {
+    "android_24_arm64_v8a": (64, 183),
+    "android_24_arm": (32, 40),
+    "android_24_i686": (32, 3),
+    "android_24_x86_64": (64, 62),
+}
+SYSTEM_NEEDED = ("libc.so", "libm.so", "libdl.so", "liblog.so")
+RUNTIME_NEEDED = ("libpython3.14.so", "libc++_shared.so")
+
+DT_NULL, DT_NEEDED, DT_STRTAB, DT_STRSZ, DT_SONAME, DT_RUNPATH = 0, 1, 5, 10, 14, 29
+
+
+def make_elf(
+    needed,
+    soname: str | None = None,
+    runpath: str | None = None,
+    elf_class: int = 64,
+    big_endian: bool = False,
+    machine: int = 183,
+    size: int = 0,
+) -> bytes:
+    """A minimal shared object with one PT_LOAD and a PT_DYNAMIC section.
+
+    Enough for readelf -d and wheel_inspect.parse_elf_dynamic. ``size``
+    pads the file with zeros (outside any segment) to a realistic length.
+    """
+    e = ">" if big_endian else "<"
+    strtab = b"\0"
+    offsets = {}
+    for s in [*needed, *(x for x in (soname, runpath) if x)]:
+        if s not in offsets:
+            offsets[s] = len(strtab)
+            strtab += s.encode() + b"\0"
+    dynamic = [(DT_NEEDED, offsets[n]) for n in needed]
+    if soname:
+        dynamic.append((DT_SONAME, offsets[soname]))
+    if runpath:
+        dynamic.append((DT_RUNPATH, offsets[runpath]))
+
+    ehsize, phsize = (64, 56) if elf_class == 64 else (52, 32)
+    phnum = 2
+    str_off = ehsize + phnum * phsize
+    dyn_off = str_off + len(strtab)
+    dyn_off += -dyn_off % 8
+    vbase = 0x1000  # PT_LOAD maps file offset 0 at this address
+    dynamic += [(DT_STRTAB, vbase + str_off), (DT_STRSZ, len(strtab)), (DT_NULL, 0)]
+    dyn_fmt = e + ("qQ" if elf_class == 64 else "iI")
+    dyn = b"".join(struct.pack(dyn_fmt, tag, value) for tag, value in dynamic)
+    total = dyn_off + len(dyn)
+
+    ident = b"\x7fELF" + bytes([2 if elf_class == 64 else 1, 2 if big_endian else 1, 1]) + b"\0" * 9
+    if elf_class == 64:
+        header = ident + struct.pack(e + "HHIQQQIHHHHHH", 3, machine, 1, 0, ehsize, 0, 0, ehsize, phsize, phnum, 64, 0, 0)
+        phdrs = struct.pack(e + "IIQQQQQQ", 1, 5, 0, vbase, vbase, total, total, 0x1000)
+        phdrs += struct.pack(e + "IIQQQQQQ", 2, 6, dyn_off, vbase + dyn_off, vbase + dyn_off, len(dyn), len(dyn), 8)
+    else:
+        header = ident + struct.pack(e + "HHIIIIIHHHHHH", 3, machine, 1, 0, ehsize, 0, 0, ehsize, phsize, phnum, 40, 0, 0)
+        phdrs = struct.pack(e + "8I", 1, 0, vbase, vbase, total, total, 5, 0x1000)
+        phdrs += struct.pack(e + "8I", 2, dyn_off, vbase + dyn_off, vbase + dyn_off, len(dyn), len(dyn), 6, 4)
+    body = header + phdrs + strtab
+    body += b"\0" * (dyn_off - len(body))
+    body += dyn
+    return body + b"\0" * max(0, size - len(body))
+
+
+def wheel_filename(name: str, version: str, platform: str) -> str:
+    return f"{name}-{version}-cp314-cp314-{platform}.whl"
+
+
+def write_wheel(
+    path: Path,
+    name: str,
+    version: str,
+    members: int = 200,
+    member_size: int = 4096,
+    seed: int = 0,
+    libs: int = 0,
+    lib_size: int = 16384,
+    platform: str = PLATFORMS[0],
+    link_to: list[str] = (),
+) -> Path:
+    """Write a wheel with ``members`` payload files plus a dist-info directory.
+
+    Payload is half random bytes and half repeated text so that deflate has
+    real work to do in both directions. ``libs`` adds ELF shared objects for
+    ``platform`` that need system and runtime libraries, the wheel's own
+    first library and the ``link_to`` sonames of other wheels.
+    """
+    rng = random.Random(seed)
+    dist_info = f"{name}-{version}.dist-info"
+    elf_class, machine = PLATFORM_ELF.get(platform, (64, 183))
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for i in range(members):
+            noise = rng.randbytes(member_size // 2)
+            text = (f"# {name} member {i}\n" * member_size)[: member_size - len(noise)]
+            zf.writestr(f"{name}/mod_{i:05d}.py", noise + text.encode())
+        for j in range(libs):
+            soname = f"lib{name}_{j}.so"
+            needed = [*rng.sample(SYSTEM_NEEDED, 2), *RUNTIME_NEEDED[: 1 + j % 2]]
+            if j:
+                needed.append(f"lib{name}_0.so")
+            needed.extend(link_to)
+            data = make_elf(needed, soname, "$ORIGIN", elf_class, machine=machine, size=lib_size)
+            zf.writestr(f"{name}/.libs/{soname}" if j else f"{name}/_core.so", data)
+        zf.writestr(
+            f"{dist_info}/METADATA",
+            f"Metadata-Version: 2.1\nName: {name}\nVersion: {version}\n",
+        )
+        zf.writestr(f"{dist_info}/WHEEL", "Wheel-Version: 1.0\nRoot-Is-Purelib: false\n")
+        zf.writestr(f"{dist_info}/RECORD", "")
+    return path
+
+
+def write_wheel_dir(
+    root: Path,
+    count: int,
+    members: int = 200,
+    member_size: int = 4096,
+    libs: int = 0,
+    lib_size: int = 16384,
+) -> list[Path]:
+    """Fill ``root`` with ``count`` wheels spread over the Android platforms.
+
+    With ``libs``, every package after the first links against the core
+    library of an earlier package, so dependency graphs have real edges.
+    """
+    root.mkdir(parents=True, exist_ok=True)
+    wheels = []
+    for i in range(count):
+        index = i // len(PLATFORMS)
+        name = f"pkg{index:04d}"
+        platform = PLATFORMS[i % len(PLATFORMS)]
+        path = root / wheel_filename(name, "1.0", platform)
+        link_to = [f"libpkg{(index - 1) // 2:04d}_0.so"] if libs and index else []
+        wheels.append(
+            write_wheel(
+                path, name, "1.0", members, member_size, seed=i,
+                libs=libs, lib_size=lib_size, platform=platform, link_to=link_to,
+            )
+        )
+    return wheels
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a corpus of synthetic Android wheels.")
+    parser.add_argument("output_dir", type=Path)
+    parser.add_argument("--wheels", type=int, default=200, help="Number of wheels (default: 200)")
+    parser.add_argument("--members", type=int, default=200, help="Payload files per wheel (default: 200)")
+    parser.add_argument("--member-size", type=int, default=4096, help="Bytes per payload file (default: 4096)")
+    parser.add_argument("--libs", type=int, default=2, help="ELF shared objects per wheel (default: 2)")
+    parser.add_argument("--lib-size", type=int, default=16384, help="Bytes per shared object (default: 16384)")
+    args = parser.parse_args()
+
+    wheels = write_wheel_dir(args.output_dir, args.wheels, args.members, args.member_size, args.libs, args.lib_size)
+    total = sum(w.stat().st_size for w in wheels)
+    print(f"Wrote {len(wheels)} wheels ({total / 1e6:.1f} MB) to {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Content-addressed cache of built recipe wheels.
+
+A recipe's key hashes everything that decides what its wheel looks like
+(recipe files and patches, source archive, dependency keys, NDK, API level,
+Python version, arch). Entries live in ``<root>/<arch>/<recipe>/<key>/`` so a
+cache dir can be shared between runs or mounted from CI storage.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+from pathlib import Path
+
+from wheel_hashes import sha256_file
+
+KEY_FILE = "key.json"
+
+
+def hash_tree(path) -> str:
+    """sha256 over every file below ``path`` (names and contents), or "" if missing."""
+    path = Path(path)
+    if not path.exists():
+        return ""
+    if path.is_file():
+        return sha256_file(path)
+    digest = hashlib.sha256()
+    for file in sorted(p for p in path.rglob("*") if p.is_file()):
+        if "__pycache__" in file.parts:
+            continue
+        digest.update(file.relative_to(path).as_posix().encode())
+        digest.update(b"\0")
+        digest.update(sha256_file(file).encode())
+    return digest.hexdigest()
+
+
+def hash_sources(package_dir) -> str:
+    """Hash of a recipe's downloaded sources in ``packages/<recipe>``.
+
+    Archives are hashed by content; git checkouts by their HEAD commit.
+    Download markers are ignored.
+    """
+    package_dir = Path(package_dir)
+    if not package_dir.is_dir():
+        return ""
+    digest = hashlib.sha256()
+    for entry in sorted(package_dir.iterdir()):
+        if entry.name.startswith(".mark-"):
+            continue
+        if entry.is_dir():
+            head = subprocess.run(
+                ["git", "-C", str(entry), "rev-parse", "HEAD"],
+                capture_output=True,
+                text=True,
+            ).stdout.strip()
+            value = head or hash_tree(entry)
+        else:
+            value = sha256_file(entry)
+        digest.update(f"{entry.name}\0{value}\n".encode())
+    return digest.hexdigest()
+
+
+def ndk_version(ndk_dir) -> str:
+    """Pkg.Revision from the NDK's source.properties, or "" if unreadable."""
+    try:
+        text = (Path(ndk_dir) / "source.properties").read_text()
+    except OSError:
+        return ""
+    for line in text.splitlines():
+        key, _, value = line.partition("=")
+        if key.strip() == "Pkg.Revision":
+            return value.strip()
+    return ""
+
+
+def cache_key(inputs: dict) -> str:
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest()
+
+
+class WheelCache:
+    def __init__(self, root):
+        self.root = Path(root)
+        self.hits = []
+        self.misses = []
+
+    def entry_dir(self, arch: str, name: str, key: str) -> Path:
+        return self.root / arch / name / key
+
+    def lookup(self, arch: str, name: str, key: str) -> list[Path] | None:
+        """Cached wheels for this key, or None. Also records the hit or miss."""
+        entry = self.entry_dir(arch, name, key)
+        wheels = sorted(entry.glob("*.whl")) if (entry / KEY_FILE).exists() else []
+        (self.hits if wheels else self.misses).append((arch, name))
+        return wheels or None
+
+    def store(self, arch: str, name: str, key: str, wheels, inputs: dict) -> Path:
+        """Copy ``wheels`` into the cache; the entry appears atomically."""
+        entry = self.entry_dir(arch, name, key)
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        tmp = Path(tempfile.mkdtemp(prefix=f".{key[:12]}-", dir=entry.parent))
+        try:
+            for wheel in wheels:
+                shutil.copy2(wheel, tmp / Path(wheel).name)
+            (tmp / KEY_FILE).write_text(json.dumps(inputs, indent=2, sort_keys=True))
+            if entry.exists():
+                shutil.rmtree(entry)
+            os.replace(tmp, entry)
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        return entry
+
+    def report(self) -> str:
+        lines = [f"Wheel cache {self.root}: {len(self.hits)} hit(s), {len(self.misses)} miss(es)"]
+        for label, items in (("hit", self.hits), ("miss", self.misses)):
+            for arch, name in sorted(items):
+                lines.append(f"  {label:4} {name} [{arch}]")
+        return "\n".join(lines)
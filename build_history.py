@@ -0,0 +1,65 @@
+"""Per-recipe build durations from past runs, used to plan CI shards.
+
+recipebuild.py appends the wall time of every recipe it actually built (not
+cache restores) after each run; ci_plan.py turns the history into costs.
+"""
+
+import fcntl
+import json
+import os
+import statistics
+from pathlib import Path
+
+HISTORY_VERSION = 1
+# Samples kept per recipe and arch; the median smooths out noisy runners.
+MAX_SAMPLES = 5
+
+
+def load(path) -> dict:
+    try:
+        data = json.loads(Path(path).read_text())
+    except (OSError, ValueError):
+        return {}
+    if data.get("version") != HISTORY_VERSION:
+        return {}
+    return data.get("recipes", {})
+
+
+def record(history: dict, name: str, arch: str, seconds: float):
+    samples = history.setdefault(name, {}).setdefault(arch, [])
+    samples.append(round(seconds, 3))
+    del samples[:-MAX_SAMPLES]
+
+
+def save(path, history: dict):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps({"version": HISTORY_VERSION, "recipes": history}, indent=2, sort_keys=True))
+    os.replace(tmp, path)
+
+
+def update(path, samples):
+    """Add ``(name, arch, seconds)`` samples; safe with several writers."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path.with_name(path.name + ".lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        history = load(path)
+        for name, arch, seconds in samples:
+            record(history, name, arch, seconds)
+        save(path, history)
+
+
+def costs(history: dict, arch: str | None = None) -> dict[str, float]:
+    """Median build seconds per recipe, for ``arch`` or the slowest arch."""
+    result = {}
+    for name, per_arch in history.items():
+        medians = [
+            statistics.median(samples)
+            for sample_arch, samples in per_arch.items()
+            if samples and (arch is None or sample_arch == arch)
+        ]
+        if medians:
+            result[name] = max(medians)
+    return result
@@ -0,0 +1,160 @@
+"""Per-phase timing and resource accounting for recipe builds.
+
+Every ``phase()`` block records wall time, CPU time (this process plus reaped
+children), child RSS and bytes written to storage. CPU, RSS and writes are
+only available per process, so a phase that overlapped another one in the
+same process (downloads on prefetch threads) is recorded as not
+``exclusive``: its numbers include the other phase's work. Results go to a
+JSON or CSV timeline and optionally a Chrome trace-event file (open in
+chrome://tracing or https://ui.perfetto.dev), one lane per thread.
+"""
+
+import contextlib
+import csv
+import json
+import os
+import resource
+import threading
+import time
+from pathlib import Path
+
+FIELDS = (
+    "recipe",
+    "arch",
+    "phase",
+    "start",
+    "wall",
+    "cpu",
+    "children_maxrss_kb",
+    "children_maxrss_hwm_kb",
+    "write_bytes",
+    "exclusive",
+    "pid",
+    "tid",
+)
+
+
+def _cpu_time() -> float:
+    total = 0.0
+    for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN):
+        usage = resource.getrusage(who)
+        total += usage.ru_utime + usage.ru_stime
+    return total
+
+
+def _write_bytes() -> int:
+    """Storage writes of this process and its reaped children, 0 if unknown."""
+    try:
+        with open("/proc/self/io", "rb") as f:
+            for line in f:
+                if line.startswith(b"write_bytes:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+class PhaseProfiler:
+    def __init__(self):
+        # perf_counter is system-wide monotonic, so forked workers share it.
+        self.origin = time.perf_counter()
+        self.records = []
+        self.lock = threading.Lock()
+        # per running phase: {"exclusive": bool}
+        self.active = []
+
+    @contextlib.contextmanager
+    def phase(self, phase: str, recipe: str, arch: str = ""):
+        state = {"exclusive": True}
+        with self.lock:
+            for other in self.active:
+                other["exclusive"] = False
+            state["exclusive"] = not self.active
+            self.active.append(state)
+        start = time.perf_counter()
+        cpu = _cpu_time()
+        written = _write_bytes()
+        maxrss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        try:
+            yield
+        finally:
+            # RUSAGE_CHILDREN ru_maxrss is the largest child reaped so far. When
+            # it rose, a child of this phase set it; otherwise this phase's
+            # children were no larger than earlier ones and the peak is unknown.
+            hwm = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+            with self.lock:
+                self.active.remove(state)
+                self.records.append(
+                    {
+                        "recipe": recipe,
+                        "arch": arch,
+                        "phase": phase,
+                        "start": round(start - self.origin, 6),
+                        "wall": round(time.perf_counter() - start, 6),
+                        "cpu": round(_cpu_time() - cpu, 6),
+                        "children_maxrss_kb": hwm if hwm > maxrss else None,
+                        "children_maxrss_hwm_kb": hwm,
+                        "write_bytes": _write_bytes() - written,
+                        "exclusive": state["exclusive"],
+                        "pid": os.getpid(),
+                        "tid": threading.get_native_id(),
+                    }
+                )
+
+    def write(self, path):
+        """Write the timeline as CSV if ``path`` ends in .csv, JSON otherwise."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        records = sorted(self.records, key=lambda r: r["start"])
+        if path.suffix == ".csv":
+            with open(path, "w", newline="") as f:
+                writer = csv.DictWriter(f, FIELDS)
+                writer.writeheader()
+                writer.writerows(records)
+        else:
+            path.write_text(json.dumps({"phases": records}, indent=2) + "\n")
+
+    def write_trace(self, path):
+        """Write Chrome trace events, one lane per build process and thread."""
+        events = [
+            {
+                "name": f"{r['recipe']} {r['phase']}",
+                "cat": r["phase"],
+                "ph": "X",
+                "ts": int(r["start"] * 1e6),
+                "dur": int(r["wall"] * 1e6),
+                "pid": r["pid"],
+                "tid": r["tid"],
+                "args": {
+                    k: r[k]
+                    for k in ("arch", "cpu", "children_maxrss_kb", "children_maxrss_hwm_kb", "write_bytes", "exclusive")
+                },
+            }
+            for r in self.records
+        ]
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({"traceEvents": events}) + "\n")
+
+    def summary(self, top: int = 10) -> str:
+        slowest = sorted(self.records, key=lambda r: r["wall"], reverse=True)[:top]
+        lines = [f"Slowest {len(slowest)} build phases (* cpu shared with overlapping phases):"]
+        for r in slowest:
+            where = f"{r['recipe']} [{r['arch']}]" if r["arch"] else r["recipe"]
+            shared = " " if r["exclusive"] else "*"
+            lines.append(
+                f"  {r['wall']:9.1f}s wall {r['cpu']:9.1f}s cpu{shared} {r['phase']:16} {where}"
+            )
+        return "\n".join(lines)
+
+
+class NullProfiler:
+    """Stand-in used when profiling is off; ``phase()`` costs one call."""
+
+    _null = contextlib.nullcontext()
+
+    def __init__(self):
+        self.records = []
+
+    def phase(self, phase, recipe, arch=""):
+        return self._null
@@ -0,0 +1,119 @@
+"""Dependency-aware scheduling of recipe builds.
+
+Kept free of python-for-android imports so the scheduling logic can be
+exercised with stub recipes and a thread pool instead of real builds.
+"""
+
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+
+OK = "ok"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+
+def recipe_dependencies(name: str, depends, opt_depends, available) -> set[str]:
+    """Dependencies of ``name`` that are part of this build.
+
+    ``depends`` entries may be tuples of alternatives, as in p4a recipes;
+    every alternative that is being built counts as a dependency.
+    """
+    deps = set()
+    for dep in list(depends) + list(opt_depends):
+        for alternative in dep if isinstance(dep, (tuple, list)) else (dep,):
+            if alternative in available and alternative != name:
+                deps.add(alternative)
+    return deps
+
+
+class BuildScheduler:
+    """Run one task per node as soon as all of its dependencies succeeded.
+
+    ``graph`` maps each node to the set of nodes it depends on. ``order`` is
+    the preferred start order among ready nodes (p4a's build order), which
+    keeps runs reproducible. A failed node marks everything that depends on
+    it, directly or not, as skipped; unrelated nodes keep building.
+
+    ``done`` gives the status of nodes that were already handled elsewhere;
+    they are not run again but still gate their dependents.
+    """
+
+    def __init__(
+        self,
+        graph: dict[str, set[str]],
+        order: list[str] | None = None,
+        done: dict[str, str] | None = None,
+    ):
+        unknown = {dep for deps in graph.values() for dep in deps} - set(graph)
+        if unknown:
+            raise ValueError(f"unknown dependencies: {', '.join(sorted(unknown))}")
+        self.graph = graph
+        self.order = list(order) if order is not None else sorted(graph)
+        self.status: dict[str, str] = dict(done or {})
+        self.errors: dict[str, BaseException] = {}
+        self.results: dict = {}
+
+    def run(self, executor, task, jobs: int, on_start=None, on_finish=None) -> dict[str, str]:
+        """Run ``task(name)`` for every node on ``executor``, at most ``jobs`` at once."""
+        pending = [name for name in self.order if name in self.graph and name not in self.status]
+        running = {}
+        while pending or running:
+            for name in list(pending):
+                if len(running) >= jobs:
+                    break
+                deps = self.graph[name]
+                if any(self.status.get(dep) in (FAILED, SKIPPED) for dep in deps):
+                    pending.remove(name)
+                    self.status[name] = SKIPPED
+                    if on_finish:
+                        on_finish(name, SKIPPED, None)
+                elif all(self.status.get(dep) == OK for dep in deps):
+                    pending.remove(name)
+                    if on_start:
+                        on_start(name)
+                    running[executor.submit(task, name)] = name
+            if not running:
+                # Everything left waits on a skipped node; the loop above
+                # marks those as skipped on the next pass.
+                if pending and not any(
+                    self.status.get(dep) in (FAILED, SKIPPED)
+                    for name in pending
+                    for dep in self.graph[name]
+                ):
+                    raise ValueError(f"dependency cycle among: {', '.join(pending)}")
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                error = future.exception()
+                self.status[name] = OK if error is None else FAILED
+                if error is not None:
+                    self.errors[name] = error
+                else:
+                    self.results[name] = future.result()
+                if on_finish:
+                    on_finish(name, self.status[name], error)
+        return self.status
+
+
+def dependency_closure(graph: dict[str, set[str]], roots) -> set[str]:
+    """``roots`` that are in ``graph`` plus everything they depend on."""
+    closure = set()
+    todo = [name for name in roots if name in graph]
+    while todo:
+        name = todo.pop()
+        if name not in closure:
+            closure.add(name)
+            todo.extend(graph[name])
+    return closure
+
+
+class InlineExecutor:
+    """Executor that runs each task in the calling thread when it is submitted."""
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
@@ -0,0 +1,10 @@
+"""Where the build, scan and index tools keep their shared caches."""
+
+import os
+from pathlib import Path
+
+
+def default_cache_dir() -> Path:
+    """``$XDG_CACHE_HOME/p4a-wheels``, falling back to ``~/.cache/p4a-wheels``."""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return Path(base) / "p4a-wheels"
@@ -0,0 +1,90 @@
+"""Split recipes into CI shards balanced by past build times.
+
+Costs come from the history recipebuild.py --history writes; recipes
+without history get the median cost. Every shard also builds the dependency
+closure of its recipes, so shards are independent of each other.
+
+example:
+  python3 ci_plan.py --shards 4 --history p4aworkdir/build-history.json -r numpy pandas kivy
+  python3 ci_plan.py --shards 4 --shard 0 ...   # "-r ..." arguments for shard 0
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+import build_history
+from cache_paths import default_cache_dir
+from recipe_list import RecipeScanner, build_catalog, find_p4a, partition
+
+
+def plan(catalog: dict, recipes: list[str], shards: int, costs: dict | None) -> list[dict]:
+    """Shards of ``recipes``; pinned names like ``numpy==2.0`` keep their pin.
+
+    A pin applies wherever the recipe is built, so it is also passed to every
+    shard that only builds it as a dependency. Shards left without recipes
+    (more shards than recipes) get no arguments.
+    """
+    spelled = {}
+    for recipe in recipes:
+        spelled[recipe.split("==")[0]] = recipe
+    catalog = dict(catalog, recipes=dict(catalog["recipes"]))
+    for name in spelled:
+        # not a known wheel recipe: still shard it, without dependencies
+        catalog["recipes"].setdefault(name, {"base": None, "closure": []})
+    result = partition(catalog, shards, costs, names=list(spelled))
+    pins = {name: spec for name, spec in spelled.items() if spec != name}
+    for shard in result:
+        specs = [spelled[name] for name in shard["recipes"]]
+        specs += [pins[name] for name in shard["build"] if name in pins and name not in shard["recipes"]]
+        shard["args"] = ["-r", *specs] if shard["recipes"] else []
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-r", "--recipes", nargs="+", help="Recipes to plan (default: every wheel recipe).")
+    parser.add_argument("--shards", type=int, default=1, help="Number of shards (default: 1).")
+    parser.add_argument("--shard", type=int, metavar="I", help="Only print the arguments of shard I (0-based).")
+    parser.add_argument("--history", type=Path, help="Build time history written by recipebuild.py --history.")
+    parser.add_argument("--arch", help="Use build times of this arch (default: the slowest arch per recipe).")
+    parser.add_argument("--catalog", type=Path, help="Catalog from recipe_list.py --json instead of scanning p4a.")
+    parser.add_argument("--json", action="store_true", help="Print the whole plan as JSON.")
+    args = parser.parse_args()
+    if args.shards < 1:
+        parser.error("--shards must be at least 1")
+    if args.shard is not None and not 0 <= args.shard < args.shards:
+        parser.error(f"--shard must be between 0 and {args.shards - 1}")
+
+    if args.catalog:
+        catalog = json.loads(args.catalog.read_text())
+    else:
+        p4a_path = find_p4a()
+        scanner = RecipeScanner(p4a_path, default_cache_dir() / "recipe-scan.json")
+        catalog = build_catalog(p4a_path / "recipes", scanner)
+
+    costs = None
+    if args.history:
+        costs = build_history.costs(build_history.load(args.history), args.arch) or None
+
+    shards = plan(catalog, args.recipes or sorted(catalog["recipes"]), args.shards, costs)
+
+    if args.shard is not None:
+        # nothing at all for an empty shard, so run_on_ci.sh can skip it
+        if shards[args.shard]["args"]:
+            print(" ".join(shards[args.shard]["args"]))
+        return
+    if args.json:
+        print(json.dumps({"estimated_from": "history" if costs else "base", "shards": shards}, indent=2))
+        return
+    for shard in shards:
+        if shard["args"]:
+            print(" ".join(shard["args"]))
+    unit = "s" if costs else " (estimated units)"
+    for i, shard in enumerate(shards):
+        print(f"shard {i}: {len(shard['recipes'])} recipes, {len(shard['build'])} builds, {shard['cost']:.0f}{unit}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
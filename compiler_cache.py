@@ -0,0 +1,103 @@
+"""ccache/sccache setup for NDK builds.
+
+Every arch and min_api gets its own cache directory,
+``<root>/<tool>/<arch>-api<min_api>``, so caches can be persisted (e.g. with
+actions/cache) and evicted per key without mixing objects built for
+different targets.
+"""
+
+import json
+import os
+import shutil
+import subprocess
+from pathlib import Path
+
+TOOLS = ("ccache", "sccache")
+# One sccache server per arch, so --parallel-archs builds keep separate dirs.
+SCCACHE_BASE_PORT = 4226
+ARCH_PORT_OFFSETS = {"arm64-v8a": 0, "armeabi-v7a": 1, "x86": 2, "x86_64": 3}
+
+
+class CompilerCache:
+    def __init__(self, tool: str, root, max_size: str | None = None):
+        if tool not in TOOLS:
+            raise ValueError(f"unknown compiler cache {tool!r}")
+        self.tool = tool
+        self.binary = shutil.which(tool)
+        if self.binary is None:
+            raise SystemExit(f"{tool} was requested but is not on PATH")
+        self.root = Path(root)
+        self.max_size = max_size
+        self.env = {}
+
+    def cache_dir(self, arch: str, min_api: int) -> Path:
+        return self.root / self.tool / f"{arch}-api{min_api}"
+
+    def activate(self, arch: str, min_api: int, basedir: str):
+        """Point the tool at this arch's cache and reset its statistics.
+
+        The variables are set in os.environ; p4a copies CCACHE_* into recipe
+        environments itself, the rest is added by recipebuild.py.
+        """
+        cache_dir = self.cache_dir(arch, min_api)
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        if self.tool == "ccache":
+            self.env = {
+                "CCACHE_DIR": str(cache_dir),
+                # hash paths relative to the workdir so other checkouts hit
+                "CCACHE_BASEDIR": os.path.abspath(basedir),
+                "CCACHE_NOHASHDIR": "1",
+                # CI re-downloads the NDK, so compiler mtimes are meaningless
+                "CCACHE_COMPILERCHECK": "content",
+            }
+            if self.max_size:
+                self.env["CCACHE_MAXSIZE"] = self.max_size
+        else:
+            self.stop()
+            self.env = {
+                "SCCACHE_DIR": str(cache_dir),
+                "SCCACHE_SERVER_PORT": str(SCCACHE_BASE_PORT + ARCH_PORT_OFFSETS.get(arch, 4)),
+                "RUSTC_WRAPPER": self.binary,
+            }
+            if self.max_size:
+                self.env["SCCACHE_CACHE_SIZE"] = self.max_size
+        os.environ.update(self.env)
+        if self.tool == "sccache":
+            self._run("--start-server")
+        self._run("-z")
+
+    def stop(self):
+        if self.tool == "sccache" and self.env:
+            self._run("--stop-server")
+
+    def _run(self, *args) -> str | None:
+        result = subprocess.run([self.binary, *args], capture_output=True, text=True, env={**os.environ, **self.env})
+        return result.stdout if result.returncode == 0 else None
+
+    def stats(self) -> tuple[int, int] | None:
+        """(hits, misses) since activate(), or None if the tool cannot say."""
+        if self.tool == "ccache":
+            # ccache >= 4: one "key<TAB>value" per line
+            out = self._run("--print-stats")
+            if out is None:
+                return None
+            values = dict(line.split("\t", 1) for line in out.splitlines() if "\t" in line)
+            hits = int(values.get("direct_cache_hit", 0)) + int(values.get("preprocessed_cache_hit", 0))
+            return hits, int(values.get("cache_miss", 0))
+        out = self._run("--show-stats", "--stats-format=json")
+        if out is None:
+            return None
+        stats = json.loads(out)["stats"]
+        return (
+            sum(stats["cache_hits"]["counts"].values()),
+            sum(stats["cache_misses"]["counts"].values()),
+        )
+
+    def summary(self, arch: str, min_api: int, stats) -> str:
+        label = f"{self.tool} [{arch}-api{min_api}]"
+        if stats is None:
+            return f"{label}: statistics unavailable"
+        hits, misses = stats
+        total = hits + misses
+        rate = f"{hits / total:.1%}" if total else "n/a"
+        return f"{label}: {hits} hits, {misses} misses ({rate} hit rate)"
@@ -0,0 +1,141 @@
+"""Resumable source downloads through a persistent, checksum-verified cache.
+
+Each URL is stored once in ``<cache>/<sha256(url)[:16]>/<filename>`` next to
+a ``.json`` record of its size and SHA-256, so the cache can be shared between
+workspaces and corrupt entries are noticed. Interrupted downloads leave a
+``.part`` file that the next attempt continues with an HTTP Range request.
+"""
+
+import fcntl
+import hashlib
+import http.client
+import json
+import os
+import shutil
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+from cache_paths import default_cache_dir
+
+CHUNK_SIZE = 1 << 20
+# Same agent as p4a: jqueryui.com answers urllib's default with a 403.
+USER_AGENT = "Wget/1.0"
+MAX_BACKOFF = 60
+
+
+def file_digest(path, alg: str) -> str:
+    hasher = hashlib.new(alg)
+    with open(path, "rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def verify(path, digests: dict[str, str], what: str):
+    for alg, expected in digests.items():
+        current = file_digest(path, alg)
+        if current != expected:
+            raise ValueError(f"{alg}sum mismatch for {what}: got {current}, expected {expected}")
+
+
+class DownloadCache:
+    def __init__(self, root=None, retries: int = 5, timeout: float = 60):
+        self.root = Path(root) if root else default_cache_dir() / "downloads"
+        self.retries = retries
+        self.timeout = timeout
+
+    def entry(self, url: str, filename: str) -> Path:
+        return self.root / hashlib.sha256(url.encode()).hexdigest()[:16] / filename
+
+    def fetch(self, url: str, filename: str, digests=None, headers=()) -> Path:
+        """Return the cached file for ``url``, downloading it if needed."""
+        path = self.entry(url, filename)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        record = path.with_name(path.name + ".json")
+        # Several builds may share the cache; one download per URL at a time.
+        with open(path.with_name(path.name + ".lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            if path.exists() and record.exists():
+                known = json.loads(record.read_text())
+                if path.stat().st_size == known["size"] and file_digest(path, "sha256") == known["sha256"]:
+                    verify(path, digests or {}, url)
+                    return path
+                path.unlink()
+
+            part = path.with_name(path.name + ".part")
+            self._download(url, part, headers)
+            try:
+                verify(part, digests or {}, url)
+            except ValueError:
+                part.unlink()
+                raise
+            record.write_text(json.dumps({
+                "url": url,
+                "size": part.stat().st_size,
+                "sha256": file_digest(part, "sha256"),
+            }))
+            os.replace(part, path)
+        return path
+
+    def _download(self, url: str, part: Path, headers):
+        delay = 1
+        for attempt in range(1, self.retries + 1):
+            offset = part.stat().st_size if part.exists() else 0
+            request = urllib.request.Request(url, headers={"User-Agent": USER_AGENT})
+            for key, value in headers or ():
+                request.add_header(key, value)
+            if offset:
+                request.add_header("Range", f"bytes={offset}-")
+            try:
+                with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                    # A 200 means the server ignored Range; start from scratch.
+                    resume = offset and response.status == 206
+                    with open(part, "ab" if resume else "wb") as f:
+                        shutil.copyfileobj(response, f, CHUNK_SIZE)
+                        received = f.tell() - (offset if resume else 0)
+                # read(n) returns short at EOF instead of raising on a cut connection.
+                length = response.headers.get("Content-Length")
+                if length is not None and received < int(length):
+                    raise http.client.IncompleteRead(b"", int(length) - received)
+                return
+            except urllib.error.HTTPError as e:
+                if e.code == 416:
+                    # Our .part does not fit the current file; drop it.
+                    part.unlink(missing_ok=True)
+                elif e.code < 500 and e.code != 429:
+                    raise
+                error = e
+            except (OSError, http.client.HTTPException) as e:
+                error = e
+            if attempt == self.retries:
+                raise error
+            print(f"Download of {url} failed ({error}); retrying in {delay}s", flush=True)
+            time.sleep(delay)
+            delay = min(delay * 2, MAX_BACKOFF)
+
+    def install(self, url: str, dest_dir, digests=None, headers=()) -> Path:
+        """Place ``url``'s file in ``dest_dir`` with p4a's ``.mark-<file>`` marker.
+
+        p4a's own download step then finds the file, checks its sums and
+        skips the download.
+        """
+        filename = os.path.basename(url)
+        dest_dir = Path(dest_dir)
+        target = dest_dir / filename
+        marker = dest_dir / f".mark-{filename}"
+        if target.is_file() and marker.exists():
+            return target
+        cached = self.fetch(url, filename, digests, headers)
+        dest_dir.mkdir(parents=True, exist_ok=True)
+        marker.unlink(missing_ok=True)
+        tmp = dest_dir / f".{filename}.tmp"
+        tmp.unlink(missing_ok=True)
+        try:
+            os.link(cached, tmp)
+        except OSError:
+            shutil.copy2(cached, tmp)
+        os.replace(tmp, target)
+        marker.touch()
+        return target
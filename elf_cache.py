@@ -0,0 +1,65 @@
+"""Scan cache of parsed ELF dynamic sections.
+
+get_wheel_lib_dep.py reads and fills it; gen_pip_index.py --scan-libs fills
+it while it reads the wheels anyway.
+"""
+
+import json
+import os
+import time
+import zipfile
+from pathlib import Path
+
+from wheel_inspect import lib_key
+
+# Size limit of the scan cache (get_wheel_lib_dep.py --cache-max-mb).
+DEFAULT_CACHE_MAX_MB = 16
+
+
+class ElfCache:
+    """On-disk cache of parsed dynamic sections, keyed by zip CRC32 and size.
+
+    Both values come from the zip central directory, so a cached library is
+    never decompressed. When the cache file would exceed ``max_bytes`` the
+    least recently used entries are dropped on save.
+    """
+
+    def __init__(self, path: Path, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        try:
+            self.entries = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            self.entries = {}
+        self.now = time.time()
+
+    @staticmethod
+    def key(zinfo: zipfile.ZipInfo) -> str:
+        return lib_key(zinfo.CRC, zinfo.file_size)
+
+    def get(self, key: str) -> dict | None:
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        entry["used"] = self.now
+        return entry["info"]
+
+    def put(self, key: str, info: dict) -> None:
+        self.entries[key] = {"info": info, "used": self.now}
+
+    def save(self) -> None:
+        sizes = {key: len(json.dumps(entry)) + len(key) + 6 for key, entry in self.entries.items()}
+        total = sum(sizes.values())
+        for key in sorted(self.entries, key=lambda k: self.entries[k]["used"]):
+            if total <= self.max_bytes:
+                break
+            total -= sizes[key]
+            del self.entries[key]
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        tmp_path.write_text(json.dumps(self.entries, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp_path, self.path)
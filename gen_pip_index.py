@@ -1,49 +1,44 @@
 #!/usr/bin/env python3
 
-import sys
-import hashlib
-import zipfile
+import argparse
+import gzip
 import html
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from collections import defaultdict
-from packaging.utils import parse_wheel_filename
+from packaging.version import Version
 
-if len(sys.argv) != 4:
-    print(
-        "usage:\n"
-        "  p4a_index_gen.py <wheel_root_dir> <release_base_url> <output_dir>\n"
-        "\nexample:\n"
-        "  p4a_index_gen.py wheels "
-        "https://github.com/user/repo/releases/download/v1.2.0 docs"
-    )
-    sys.exit(1)
+import wheel_hashes
+from cache_paths import default_cache_dir
+from elf_cache import DEFAULT_CACHE_MAX_MB, ElfCache
+from wheel_inspect import inspect_wheel, wheel_tags
 
-wheel_root = Path(sys.argv[1])
-base_url = sys.argv[2].rstrip("/")
-if base_url in ("", ".", "./"):
-    base_url = None
-out_root = Path(sys.argv[3])
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
-if not wheel_root.is_dir():
-    raise SystemExit("wheel_root_dir is not a directory")
+# Manifest of already indexed wheels, stored next to the generated index so a
+# rerun only touches wheels and package pages that actually changed.
+MANIFEST_NAME = ".p4a-index-manifest.json"
+MANIFEST_VERSION = 2
 
+# Precompressed variants written next to generated files with --compress.
+# mtime=0 keeps the gzip output reproducible between runs.
+COMPRESSORS = {
+    "gz": lambda data: gzip.compress(data, compresslevel=9, mtime=0),
+    "br": lambda data: brotli.compress(data, quality=11),
+}
 
-def pkg_name_from_wheel(filename: str) -> str:
-    """Extract normalized package name from wheel using packaging."""
-    name, _, _, _ = parse_wheel_filename(filename)
-    return name.lower().replace("_", "-")
+# PEP 691 JSON simple API; 1.1 (PEP 700) adds file sizes and the version list.
+SIMPLE_JSON_VERSION = "1.1"
 
 
-def extract_wheel_metadata_bytes(whl_path: Path) -> bytes | None:
-    """Return the METADATA bytes from a wheel, or None if not found."""
-    try:
-        with zipfile.ZipFile(whl_path, "r") as zf:
-            for name in zf.namelist():
-                if name.endswith(".dist-info/METADATA"):
-                    return zf.read(name)
-    except Exception as e:
-        raise SystemExit(f"Failed to read wheel metadata: {whl_path.name} because {e}") from e
-    return None
+def pkg_name_from_wheel(filename: str) -> str:
+    """Extract normalized package name from wheel using packaging."""
+    return wheel_tags(filename)["name"].lower().replace("_", "-")
 
 
 _last_progress_len = 0
@@ -73,62 +68,237 @@ def iter_wheels_with_progress(root: Path):
     print()
 
 
-# Collect wheels by package
-packages = defaultdict(list)
-for whl in iter_wheels_with_progress(wheel_root):
+def load_manifest(path: Path) -> dict:
+    """Load the index manifest, or return an empty one if missing or stale."""
+    empty = {"version": MANIFEST_VERSION, "base_url": None, "wheels": {}, "packages": {}}
     try:
-        pkg = pkg_name_from_wheel(whl.name)
+        manifest = json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return empty
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable manifest {path}: {e}")
+        return empty
+    if not isinstance(manifest, dict) or manifest.get("version") != MANIFEST_VERSION:
+        return empty
+    return manifest
+
+
+def save_manifest(path: Path, manifest: dict) -> None:
+    # Write to a temporary file first so an interrupted run never leaves a
+    # truncated manifest behind.
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_text(json.dumps(manifest, indent=1, sort_keys=True) + "\n", encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def metadata_sidecar(whl_path: Path) -> Path:
+    return whl_path.with_name(whl_path.name + ".metadata")
+
+
+def remove_sidecar(whl_path: Path) -> None:
+    """Drop the ``.metadata`` sidecar, and its variants, of a wheel that is gone."""
+    sidecar = metadata_sidecar(whl_path)
+    sidecar.unlink(missing_ok=True)
+    for fmt in COMPRESSORS:
+        variant_path(sidecar, fmt).unlink(missing_ok=True)
+
+
+def variant_path(path: Path, fmt: str) -> Path:
+    return path.with_name(f"{path.name}.{fmt}")
+
+
+def has_variants(path: Path, formats: tuple[str, ...]) -> bool:
+    return path.is_file() and all(variant_path(path, fmt).is_file() for fmt in formats)
+
+
+def sync_variants(path: Path, formats: tuple[str, ...]) -> None:
+    """Write the requested compressed copies of ``path`` and drop stale ones."""
+    data = path.read_bytes() if formats else b""
+    for fmt, compress in COMPRESSORS.items():
+        target = variant_path(path, fmt)
+        if fmt in formats:
+            target.write_bytes(compress(data))
+        else:
+            target.unlink(missing_ok=True)
+
+
+def report_compression(paths: list[Path], formats: tuple[str, ...]) -> None:
+    """Print how many bytes the compressed variants of ``paths`` save."""
+    raw = sum(path.stat().st_size for path in paths)
+    for fmt in formats:
+        packed = sum(variant_path(path, fmt).stat().st_size for path in paths)
+        saved = raw - packed
+        ratio = 100 * saved / raw if raw else 0
+        print(f"  .{fmt}: {len(paths)} files, {raw} -> {packed} bytes ({saved} saved, {ratio:.1f}%)")
+
+
+def is_indexed(whl_path: Path, st: os.stat_result, entry: dict | None) -> bool:
+    """Whether a manifest entry still describes the wheel on disk."""
+    if entry is None:
+        return False
+    if entry.get("size") != st.st_size or entry.get("mtime_ns") != st.st_mtime_ns:
+        return False
+    # A deleted sidecar has to be regenerated even if the wheel is unchanged.
+    return entry.get("metadata_sha256") is None or metadata_sidecar(whl_path).is_file()
+
+
+def index_wheel(whl_path: Path, scan_libs: bool = False) -> tuple[dict, dict]:
+    """Write the wheel's ``.metadata`` sidecar and return its manifest entry.
+
+    The wheel is read once for its digest, METADATA and, with ``scan_libs``,
+    the dynamic sections of its libraries, returned as ``{cache key: info}``.
+    """
+    try:
+        inspected = inspect_wheel(whl_path, None if scan_libs else ())
     except Exception as e:
-        raise SystemExit(f"Invalid wheel filename: {whl.name} because {e}") from e
-    packages[pkg].append(whl.name)
-# p4a root
-p4a_root = out_root / "p4a"
-p4a_root.mkdir(parents=True, exist_ok=True)
-
-total_wheels = sum(len(wheels) for wheels in packages.values())
-processed_wheels = 0
-
-# Generate pip-compatible package indexes + metadata
-for pkg, wheels in packages.items():
-    pkg_dir = p4a_root / pkg
+        raise SystemExit(f"Failed to read wheel metadata: {whl_path.name} because {e}") from e
+    entry = {
+        "size": inspected["size"],
+        "mtime_ns": inspected["mtime_ns"],
+        "sha256": inspected["sha256"],
+        "metadata_sha256": inspected["metadata_sha256"],
+    }
+    if inspected["metadata"] is not None:
+        metadata_sidecar(whl_path).write_bytes(inspected["metadata"])
+        # Sidecars are published as release assets, where only the plain
+        # .metadata is uploaded; drop compressed copies from older runs.
+        sync_variants(metadata_sidecar(whl_path), ())
+    libs = {inspected["lib_keys"][member]: info for member, info in inspected["libs"].items()}
+    return entry, libs
+
+
+def index_wheels(
+    wheel_root: Path,
+    names: list[str],
+    jobs: int = 1,
+    scan_libs: bool = False,
+):
+    """Yield ``(name, entry, libs)`` for every wheel in ``names``.
+
+    With ``jobs > 1`` the wheels are indexed on a thread pool and yielded in
+    completion order. zlib and hashlib release the GIL on large buffers, so
+    threads are enough to keep several cores busy.
+    """
+    if jobs <= 1:
+        for w in names:
+            yield w, *index_wheel(wheel_root / w, scan_libs)
+        return
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = {pool.submit(index_wheel, wheel_root / w, scan_libs): w for w in names}
+        for future in as_completed(futures):
+            yield futures[future], *future.result()
+
+
+def write_package_page(pkg_dir: Path, wheels: list[str], entries: dict, base_url: str | None) -> Path:
     pkg_dir.mkdir(parents=True, exist_ok=True)
-    wheels.sort()
     index_path = pkg_dir / "index.html"
     with index_path.open("w", encoding="utf-8") as f:
         f.write("<!doctype html>\n<html><body>\n")
         for w in wheels:
-            processed_wheels += 1
-            print_progress("Indexing wheels", processed_wheels, total_wheels, w)
-            whl_path = wheel_root / w
-            metadata_bytes = extract_wheel_metadata_bytes(whl_path)
+            metadata_hash = entries[w]["metadata_sha256"]
             metadata_attr = ""
-            if metadata_bytes is not None:
-                metadata_path = whl_path.with_name(whl_path.name + ".metadata")
-                metadata_path.write_bytes(metadata_bytes)
-                metadata_hash = hashlib.sha256(metadata_bytes).hexdigest()
+            if metadata_hash is not None:
                 metadata_attr = f' data-dist-info-metadata="sha256={metadata_hash}"'
             href = f"{base_url}/{w}" if base_url else w
+            href += f"#sha256={entries[w]['sha256']}"
             f.write(f'<a href="{href}"{metadata_attr}>{w}</a><br>\n')
         f.write("</body></html>\n")
-print()
+    return index_path
 
-# Collect supported platform tags from wheel filenames
-platform_tags = set()
-for wheels in packages.values():
+
+def package_json(pkg: str, wheels: list[str], entries: dict, base_url: str | None) -> dict:
+    """Build the PEP 691 JSON view of the same files listed in index.html."""
+    files = []
+    versions = set()
     for w in wheels:
-        try:
-            _, _, _, tags = parse_wheel_filename(w)
-            platform_tags.update(tag.platform for tag in tags)
-        except Exception:
-            continue
-if "android_24_arm64_v8a" in platform_tags:
-    platform_tags.add("android_24_aarch64")
-
-# Generate human-friendly landing page at p4a/index.html
-landing_path = p4a_root / "index.html"
-with landing_path.open("w", encoding="utf-8") as f:
-    f.write(
-        f"""<!doctype html>
+        entry = entries[w]
+        versions.add(Version(wheel_tags(w)["version"]))
+        metadata_hash = entry["metadata_sha256"]
+        core_metadata = {"sha256": metadata_hash} if metadata_hash is not None else False
+        files.append(
+            {
+                "filename": w,
+                "url": f"{base_url}/{w}" if base_url else w,
+                "hashes": {"sha256": entry["sha256"]},
+                "core-metadata": core_metadata,
+                # Pre-PEP 714 name, still read by older clients.
+                "dist-info-metadata": core_metadata,
+                "size": entry["size"],
+            }
+        )
+    return {
+        "meta": {"api-version": SIMPLE_JSON_VERSION},
+        "name": pkg,
+        "versions": [str(v) for v in sorted(versions)],
+        "files": files,
+    }
+
+
+def write_root_json(p4a_root: Path, packages: dict) -> Path:
+    """Write the PEP 691 project list next to the landing page."""
+    doc = {
+        "meta": {"api-version": SIMPLE_JSON_VERSION},
+        "projects": [{"name": pkg} for pkg in sorted(packages)],
+    }
+    return write_json(p4a_root / "index.json", doc)
+
+
+def write_all_json(p4a_root: Path, packages: dict, entries: dict, base_url: str | None) -> Path:
+    """Write every project's file list into one document (p4a/all.json).
+
+    Resolvers can fetch this (or its .gz/.br variant) once instead of one
+    page per project.
+    """
+    projects = {}
+    for pkg in sorted(packages):
+        doc = package_json(pkg, packages[pkg], entries, base_url)
+        if not base_url:
+            # relative links are resolved against p4a/, not p4a/<pkg>/
+            for file in doc["files"]:
+                file["url"] = f"{pkg}/{file['url']}"
+        projects[pkg] = {"versions": doc["versions"], "files": doc["files"]}
+    doc = {"meta": {"api-version": SIMPLE_JSON_VERSION}, "projects": projects}
+    return write_json(p4a_root / "all.json", doc)
+
+
+def write_json(path: Path, doc: dict) -> Path:
+    path.write_text(json.dumps(doc, separators=(",", ":")) + "\n", encoding="utf-8")
+    return path
+
+
+def remove_package_page(pkg_dir: Path) -> None:
+    for page in (pkg_dir / "index.html", pkg_dir / "index.json"):
+        page.unlink(missing_ok=True)
+        for fmt in COMPRESSORS:
+            variant_path(page, fmt).unlink(missing_ok=True)
+    try:
+        pkg_dir.rmdir()
+    except OSError:
+        # Not empty (or already gone): leave anything we did not write alone.
+        pass
+
+
+def collect_platform_tags(packages: dict) -> set[str]:
+    """Collect supported platform tags from wheel filenames."""
+    platform_tags = set()
+    for wheels in packages.values():
+        for w in wheels:
+            try:
+                platform_tags.update(wheel_tags(w)["platforms"])
+            except Exception:
+                continue
+    if "android_24_arm64_v8a" in platform_tags:
+        platform_tags.add("android_24_aarch64")
+    return platform_tags
+
+
+def write_landing_page(p4a_root: Path, packages: dict) -> Path:
+    """Generate human-friendly landing page at p4a/index.html."""
+    platform_tags = collect_platform_tags(packages)
+    landing_path = p4a_root / "index.html"
+    with landing_path.open("w", encoding="utf-8") as f:
+        f.write(
+            f"""<!doctype html>
 <html lang="en">
 <head>
 <meta charset="utf-8">
@@ -166,24 +336,24 @@ footer {{ margin-top:3rem; font-size:0.85rem; color: var(--muted); }}
 <pre><code>pip install --extra-index-url https://anshdadwal.is-a.dev/p4a-wheels/p4a/ &lt;package&gt;</code></pre>
 <p>Supported platform tags:</p>
 <pre><code>"""
-    )
-    if platform_tags:
-        for tag in sorted(platform_tags):
-            f.write(f"{html.escape(tag)}\n")
-    else:
-        f.write("(none detected)\n")
-    f.write("</code></pre>\n")
-    f.write(
-        """
+        )
+        if platform_tags:
+            for tag in sorted(platform_tags):
+                f.write(f"{html.escape(tag)}\n")
+        else:
+            f.write("(none detected)\n")
+        f.write("</code></pre>\n")
+        f.write(
+            """
 
 <p>Available packages:</p>
 <ul>
 """
-    )
-    for pkg in sorted(packages):
-        f.write(f'<li><a href="{pkg}/">{pkg}</a></li>\n')
-    f.write(
-        """</ul>
+        )
+        for pkg in sorted(packages):
+            f.write(f'<li><a href="{pkg}/">{pkg}</a></li>\n')
+        f.write(
+            """</ul>
 <footer>
 <p>Static p4a index · GitHub Pages</p>
 </footer>
@@ -191,6 +361,191 @@ footer {{ margin-top:3rem; font-size:0.85rem; color: var(--muted); }}
 </body>
 </html>
 """
+        )
+    return landing_path
+
+
+def main(
+    wheel_root: Path,
+    base_url: str | None,
+    out_root: Path,
+    full: bool = False,
+    jobs: int = 1,
+    formats: tuple[str, ...] = (),
+    elf_cache: ElfCache | None = None,
+) -> None:
+    if not wheel_root.is_dir():
+        raise SystemExit("wheel_root_dir is not a directory")
+    if "br" in formats and brotli is None:
+        raise SystemExit("--compress br needs the 'brotli' package (pip install brotli)")
+
+    # Collect wheels by package
+    packages = defaultdict(list)
+    for whl in iter_wheels_with_progress(wheel_root):
+        try:
+            pkg = pkg_name_from_wheel(whl.name)
+        except Exception as e:
+            raise SystemExit(f"Invalid wheel filename: {whl.name} because {e}") from e
+        packages[pkg].append(whl.name)
+    for wheels in packages.values():
+        wheels.sort()
+    # p4a root
+    p4a_root = out_root / "p4a"
+    p4a_root.mkdir(parents=True, exist_ok=True)
+
+    manifest_path = out_root / MANIFEST_NAME
+    manifest = load_manifest(manifest_path)
+    old_entries = {} if full else manifest["wheels"]
+    old_packages = {} if full else manifest["packages"]
+    # Every page embeds the base URL, so changing it invalidates all of them.
+    pages_stale = full or manifest["base_url"] != base_url
+
+    entries = {}
+    changed = []
+    for wheels in packages.values():
+        for w in wheels:
+            whl_path = wheel_root / w
+            entry = old_entries.get(w)
+            if is_indexed(whl_path, whl_path.stat(), entry):
+                entries[w] = entry
+            else:
+                changed.append(w)
+
+    added, updated = [], []
+    scan_libs = elf_cache is not None
+    for i, (w, entry, libs) in enumerate(index_wheels(wheel_root, changed, jobs, scan_libs), 1):
+        print_progress("Indexing wheels", i, len(changed), w)
+        for key, info in libs.items():
+            elf_cache.put(key, info)
+        old = old_entries.get(w)
+        if old is None:
+            added.append(w)
+        elif old.get("sha256") != entry["sha256"] or old.get("metadata_sha256") != entry["metadata_sha256"]:
+            updated.append(w)
+        entries[w] = entry
+    if changed:
+        print()
+    if elf_cache is not None:
+        elf_cache.save()
+    # From the manifest even with --full, so sidecars of deleted wheels do
+    # not stay behind (release.py uploads every sidecar it finds).
+    removed = sorted(set(manifest["wheels"]) - set(entries))
+    for w in removed:
+        remove_sidecar(wheel_root / w)
+    # Share the digests with release.py so it does not hash the wheels again.
+    hashes = wheel_hashes.load(wheel_root)
+    reindexed = set(changed)
+    for w, entry in entries.items():
+        whl_path = wheel_root / w
+        if wheel_hashes.lookup(hashes, whl_path) != entry["sha256"]:
+            wheel_hashes.record(hashes, whl_path, entry["sha256"], whl_path.stat())
+        if w in reindexed and entry["metadata_sha256"] is not None:
+            wheel_hashes.record(hashes, metadata_sidecar(whl_path), entry["metadata_sha256"])
+    wheel_hashes.save(wheel_root, hashes)
+
+    added.sort()
+    updated.sort()
+
+    # Generate pip-compatible package indexes
+    dirty = set(added) | set(updated)
+    rewritten = 0
+    pages = []
+    for pkg, wheels in packages.items():
+        pkg_dir = p4a_root / pkg
+        if (
+            pages_stale
+            or old_packages.get(pkg) != wheels
+            or dirty.intersection(wheels)
+            or not has_variants(pkg_dir / "index.html", formats)
+            or not has_variants(pkg_dir / "index.json", formats)
+        ):
+            pages.append(write_package_page(pkg_dir, wheels, entries, base_url))
+            doc = package_json(pkg, wheels, entries, base_url)
+            pages.append(write_json(pkg_dir / "index.json", doc))
+            rewritten += 1
+    for pkg in sorted(set(old_packages) - set(packages)):
+        remove_package_page(p4a_root / pkg)
+
+    pages.append(write_landing_page(p4a_root, packages))
+    pages.append(write_root_json(p4a_root, packages))
+    pages.append(write_all_json(p4a_root, packages, entries, base_url))
+    for page in pages:
+        sync_variants(page, formats)
+
+    save_manifest(
+        manifest_path,
+        {
+            "version": MANIFEST_VERSION,
+            "base_url": base_url,
+            "wheels": entries,
+            "packages": {pkg: wheels for pkg, wheels in sorted(packages.items())},
+        },
+    )
+
+    for label, names in (("added", added), ("updated", updated), ("removed", removed)):
+        for name in names:
+            print(f"  {label}: {name}")
+    print(
+        f"p4a: {len(added)} added, {len(updated)} updated, {len(removed)} removed wheels; "
+        f"rewrote {rewritten}/{len(packages)} package indexes + landing page"
+    )
+    if formats:
+        report_compression(pages, formats)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Generate a PEP 503 index (with PEP 658 metadata) for a directory of wheels.",
+        epilog=(
+            "example:\n"
+            "  gen_pip_index.py wheels "
+            "https://github.com/user/repo/releases/download/v1.2.0 docs"
+        ),
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("wheel_root_dir", help="Directory containing .whl files")
+    parser.add_argument("release_base_url", help="Base URL the wheels are downloaded from ('.' for relative links)")
+    parser.add_argument("output_dir", help="Directory the p4a/ index is written into")
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help=f"Ignore {MANIFEST_NAME} and reindex every wheel",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Index wheels on N threads (0 = one per CPU, default: 1)",
+    )
+    parser.add_argument(
+        "--compress",
+        metavar="FORMATS",
+        help="Also write precompressed copies of generated files: 'gz', 'br' or 'gz,br'",
+    )
+    parser.add_argument(
+        "--scan-libs",
+        action="store_true",
+        help="Also parse bundled .so files while reading the wheels and store them in "
+        "get_wheel_lib_dep.py's scan cache, so it does not read the wheels again",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=default_cache_dir(),
+        help="Scan cache directory for --scan-libs (default: %(default)s)",
     )
+    args = parser.parse_args()
 
-print(f"p4a: updated indexes for {len(packages)} packages + landing page")
+    base_url = args.release_base_url.rstrip("/")
+    if base_url in ("", ".", "./"):
+        base_url = None
+    formats = tuple(fmt for fmt in args.compress.split(",") if fmt) if args.compress else ()
+    unknown = sorted(set(formats) - set(COMPRESSORS))
+    if unknown:
+        parser.error(f"unknown --compress format(s): {', '.join(unknown)}")
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    elf_cache = None
+    if args.scan_libs:
+        elf_cache = ElfCache(args.cache_dir / "elf-scan.json", DEFAULT_CACHE_MAX_MB * 1024 * 1024)
+    main(Path(args.wheel_root_dir), base_url, Path(args.output_dir), args.full, jobs, formats, elf_cache)
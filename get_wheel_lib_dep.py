@@ -1,11 +1,52 @@
 import os
+import fnmatch
+import hashlib
+import json
 import zipfile
 import subprocess
 import re
-import shutil
+import tempfile
 import argparse
 from collections import defaultdict
-from packaging.utils import parse_wheel_filename
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+from cache_paths import default_cache_dir
+from elf_cache import DEFAULT_CACHE_MAX_MB, ElfCache
+from wheel_inspect import inspect_wheel, wheel_tags
+
+# Libraries every Android device provides (NDK sysroot stub libraries).
+NDK_SYSTEM_LIBS = frozenset(
+    {
+        "libEGL.so",
+        "libGLESv1_CM.so",
+        "libGLESv2.so",
+        "libGLESv3.so",
+        "libOpenMAXAL.so",
+        "libOpenSLES.so",
+        "libaaudio.so",
+        "libamidi.so",
+        "libandroid.so",
+        "libbinder_ndk.so",
+        "libc.so",
+        "libcamera2ndk.so",
+        "libdl.so",
+        "libicu.so",
+        "libjnigraphics.so",
+        "liblog.so",
+        "libm.so",
+        "libmediandk.so",
+        "libnativewindow.so",
+        "libneuralnetworks.so",
+        "libstdc++.so",
+        "libsync.so",
+        "libvulkan.so",
+        "libz.so",
+    }
+)
+
+# Libraries a p4a distribution always ships alongside the wheels.
+DEFAULT_RUNTIME_LIBS = ("libpython3*.so", "libc++_shared.so")
 
 
 def get_dependencies(so_path):
@@ -21,22 +62,107 @@ def get_dependencies(so_path):
         return []
 
 
-def process_wheels(wheel_dir: str):
-    wheels = [
+def scan_wheel(whl: str, members: list[str] | None = None) -> dict[str, dict] | None:
+    """Parse the dynamic section of every .so (or just ``members``) straight from the zip."""
+    if members is not None:
+        members = [so for so in members if so.endswith(".so")]
+        if not members:
+            return {}
+    try:
+        return inspect_wheel(whl, members, hash_file=False)["libs"]
+    except Exception:
+        return None
+
+
+def scan_wheel_readelf(whl: str, members: list[str] | None = None) -> dict[str, dict] | None:
+    """Extract every .so to a scratch directory and run readelf on it."""
+    try:
+        with zipfile.ZipFile(whl, "r") as z, tempfile.TemporaryDirectory() as temp_dir:
+            libs = {}
+            for so in z.namelist() if members is None else members:
+                if so.endswith(".so"):
+                    extract_path = z.extract(so, path=temp_dir)
+                    found_deps = get_dependencies(extract_path)
+                    libs[so] = {"needed": found_deps, "soname": None, "runpath": None}
+
+                    # Immediate cleanup of the extracted .so
+                    os.remove(extract_path)
+            return libs
+    except Exception:
+        return None
+
+
+def scan_wheels(wheels: list[str], scan=scan_wheel, jobs: int = 1, members: list | None = None):
+    """Yield ``(wheel, libs)`` in input order, fanning out over processes if jobs > 1."""
+    members = members or [None] * len(wheels)
+    if jobs <= 1:
+        for whl, names in zip(wheels, members):
+            yield whl, scan(whl, names)
+        return
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        yield from zip(wheels, pool.map(scan, wheels, members))
+
+
+def split_cached(wheels: list[str], cache: ElfCache) -> tuple[list, list]:
+    """Look every .so up in ``cache`` using only the zip central directories.
+
+    Returns, per wheel, the cached ``{member: info}`` (or None for unreadable
+    wheels) and ``{member: key}`` for the libraries that still need parsing.
+    """
+    cached, missing = [], []
+    for whl in wheels:
+        try:
+            with zipfile.ZipFile(whl, "r") as z:
+                infos = [i for i in z.infolist() if i.filename.endswith(".so")]
+        except Exception:
+            cached.append(None)
+            missing.append({})
+            continue
+        hits, misses = {}, {}
+        for zinfo in infos:
+            key = cache.key(zinfo)
+            info = cache.get(key)
+            if info is None:
+                misses[zinfo.filename] = key
+            else:
+                hits[zinfo.filename] = info
+        cached.append(hits)
+        missing.append(misses)
+    return cached, missing
+
+
+def scan_wheel_dir(
+    wheel_dir: str,
+    jobs: int = 1,
+    use_readelf: bool = False,
+    cache: ElfCache | None = None,
+) -> dict:
+    """Scan every wheel in ``wheel_dir``.
+
+    Returns ``{wheel_name: (platform_tag, libs)}`` where ``libs`` maps each
+    .so member to its dynamic info, or is None if the wheel could not be read.
+    """
+    wheels = sorted(
         os.path.join(wheel_dir, f)
         for f in os.listdir(wheel_dir)
         if f.endswith(".whl")
-    ]
+    )
 
     if not wheels:
         print("No .whl files found in the target directory.")
-        return
+        return {}
 
-    arch_summary = defaultdict(set)
+    scans = {}
     total_wheels = len(wheels)
-    temp_dir = "temp_extract"
+    scan = scan_wheel_readelf if use_readelf else scan_wheel
+    cached = missing = None
+    if cache is not None:
+        cached, missing = split_cached(wheels, cache)
+        results = scan_wheels(wheels, scan, jobs, [list(m) for m in missing])
+    else:
+        results = scan_wheels(wheels, scan, jobs)
 
-    for index, whl in enumerate(wheels, 1):
+    for index, (whl, libs) in enumerate(results, 1):
         whl_name = os.path.basename(whl)
         # Progress calculation
         percent = (index / total_wheels) * 100
@@ -49,28 +175,34 @@ def process_wheels(wheel_dir: str):
         )
 
         # Detect architecture
-        name, version, build, tags = parse_wheel_filename(whl_name)
-        tags = [tag.platform for tag in tags]
-        arch = tags[0]
-        # "arm64" if "arm64_v8a" in whl else "arm" if "_arm" in whl else "unknown"
+        arch = wheel_tags(whl_name)["platforms"][0]
 
-        try:
-            with zipfile.ZipFile(whl, "r") as z:
-                so_files = [name for name in z.namelist() if name.endswith(".so")]
+        if cache is not None:
+            if cached[index - 1] is None:
+                libs = None
+            elif libs is not None:
+                for member, key in missing[index - 1].items():
+                    if member in libs:
+                        cache.put(key, libs[member])
+                libs = {**cached[index - 1], **libs}
+        scans[whl_name] = (arch, libs)
 
-                for so in so_files:
-                    extract_path = z.extract(so, path=temp_dir)
-                    found_deps = get_dependencies(extract_path)
-                    arch_summary[arch].update(found_deps)
+    # Clear the progress line before printing results
+    print("\r" + " " * 100 + "\rScan Complete.")
+    return scans
 
-                    # Immediate cleanup of the extracted .so
-                    os.remove(extract_path)
-        except Exception:
+
+def consolidate(scans: dict) -> dict:
+    arch_summary = defaultdict(set)
+    for arch, libs in scans.values():
+        if libs is None:
             continue
+        for info in libs.values():
+            arch_summary[arch].update(info["needed"])
+    return arch_summary
 
-    # Clear the progress line before printing results
-    print("\r" + " " * 100 + "\rScan Complete.")
 
+def print_consolidated(arch_summary: dict) -> None:
     # Final Consolidated Output
     print("\n" + "=" * 60)
     print("FINAL CONSOLIDATED LIBRARIES PER ARCHITECTURE")
@@ -90,9 +222,205 @@ def process_wheels(wheel_dir: str):
         if line != "  ":
             print(line.rstrip(", "))
 
-    # Cleanup temp directory
-    if os.path.exists(temp_dir):
-        shutil.rmtree(temp_dir)
+
+def build_dependency_graph(scans: dict, runtime_libs=DEFAULT_RUNTIME_LIBS) -> dict:
+    """Resolve every NEEDED entry to the library that provides it.
+
+    Providers are looked up per platform tag: first a library in the same
+    wheel, then any other wheel (by DT_SONAME, or file name if there is none),
+    then the NDK system libraries, then ``runtime_libs`` (glob patterns for
+    libraries the p4a distribution ships itself). Anything else is
+    unresolved. Libraries that declare a SONAME but that nothing links
+    against are listed as unused.
+    """
+    provided = defaultdict(list)
+    for whl_name, (arch, libs) in sorted(scans.items()):
+        for member, info in sorted((libs or {}).items()):
+            soname = info["soname"] or os.path.basename(member)
+            provided[arch, soname].append((whl_name, member))
+
+    platforms = {}
+    used = set()
+    for whl_name, (arch, libs) in sorted(scans.items()):
+        platform = platforms.setdefault(arch, {"wheels": {}, "unresolved": {}, "unused": []})
+        wheel_node = platform["wheels"][whl_name] = {}
+        for member, info in sorted((libs or {}).items()):
+            needed = []
+            for lib in info["needed"]:
+                candidates = provided.get((arch, lib), [])
+                local = [c for c in candidates if c[0] == whl_name]
+                if local or candidates:
+                    provider_wheel, provider_member = (local or candidates)[0]
+                    provider = {"kind": "wheel", "wheel": provider_wheel, "member": provider_member}
+                    used.add((provider_wheel, provider_member))
+                elif lib in NDK_SYSTEM_LIBS:
+                    provider = {"kind": "ndk"}
+                elif any(fnmatch.fnmatchcase(lib, pattern) for pattern in runtime_libs):
+                    provider = {"kind": "runtime"}
+                else:
+                    provider = {"kind": "unresolved"}
+                    platform["unresolved"].setdefault(lib, []).append(f"{whl_name}:{member}")
+                needed.append({"name": lib, "provider": provider})
+            wheel_node[member] = {"soname": info["soname"], "runpath": info["runpath"], "needed": needed}
+
+    for whl_name, (arch, libs) in sorted(scans.items()):
+        for member, info in sorted((libs or {}).items()):
+            if info["soname"] and (whl_name, member) not in used:
+                platforms[arch]["unused"].append({"wheel": whl_name, "member": member, "soname": info["soname"]})
+
+    return {"platforms": platforms}
+
+
+def format_dependency_report(graph: dict) -> str:
+    lines = []
+    for arch, platform in sorted(graph["platforms"].items()):
+        lines.append(f"[{arch}]")
+        for whl_name, members in platform["wheels"].items():
+            if not members:
+                continue
+            lines.append(f"  {whl_name}")
+            for member, node in members.items():
+                lines.append(f"    {member}")
+                for dep in node["needed"]:
+                    provider = dep["provider"]
+                    if provider["kind"] == "wheel":
+                        where = f"{provider['wheel']}:{provider['member']}"
+                    else:
+                        where = provider["kind"]
+                    lines.append(f"      {dep['name']} -> {where}")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def print_problems(graph: dict) -> int:
+    """Print unresolved and unused libraries per platform; return unresolved count."""
+    unresolved_total = 0
+    for arch, platform in sorted(graph["platforms"].items()):
+        unresolved = platform["unresolved"]
+        unused = platform["unused"]
+        if not unresolved and not unused:
+            continue
+        print(f"\n[{arch.upper()}]")
+        for lib, users in sorted(unresolved.items()):
+            print(f"  MISSING {lib} (needed by {', '.join(users)})")
+        for lib in unused:
+            print(f"  UNUSED  {lib['soname']} ({lib['wheel']}:{lib['member']})")
+        unresolved_total += len(unresolved)
+    return unresolved_total
+
+
+def hash_members(whl: str, members: list[str]) -> dict[str, str]:
+    with zipfile.ZipFile(whl, "r") as z:
+        return {member: hashlib.sha256(z.read(member)).hexdigest() for member in members}
+
+
+def find_duplicates(wheel_dir: str, scans: dict, jobs: int = 1) -> dict:
+    """Group the bundled libraries of every platform tag by content.
+
+    Libraries whose CRC32 and size (from the zip central directory) match
+    another one on the same platform are decompressed and SHA-256 hashed to
+    confirm; nothing else is read. Returns, per platform, the groups of
+    identical copies with the bytes every copy but the first wastes, and the
+    SONAMEs bundled in more than one different build. Only a real DT_SONAME
+    counts as "the same library": extension modules without one (and every
+    --readelf scan, which does not read it) are only checked for identical
+    copies.
+    """
+    candidates = defaultdict(list)
+    for whl_name, (arch, libs) in sorted(scans.items()):
+        if not libs:
+            continue
+        with zipfile.ZipFile(os.path.join(wheel_dir, whl_name), "r") as z:
+            for member, info in sorted(libs.items()):
+                zinfo = z.getinfo(member)
+                candidates[arch, ElfCache.key(zinfo)].append((whl_name, member, info["soname"], zinfo.file_size))
+
+    to_hash = defaultdict(list)
+    for copies in candidates.values():
+        if len(copies) > 1:
+            for whl_name, member, _, _ in copies:
+                to_hash[whl_name].append(member)
+    with ThreadPoolExecutor(max(jobs, 1)) as pool:
+        names = sorted(to_hash)
+        hashed = pool.map(lambda w: hash_members(os.path.join(wheel_dir, w), to_hash[w]), names)
+        digests = {(w, member): digest for w, result in zip(names, hashed) for member, digest in result.items()}
+
+    contents = defaultdict(list)
+    for (arch, key), copies in candidates.items():
+        for whl_name, member, soname, size in copies:
+            # a lone CRC32/size pair is already unique on its platform
+            content = digests.get((whl_name, member), key)
+            contents[arch, content].append({"wheel": whl_name, "member": member, "soname": soname, "size": size})
+
+    platforms = {}
+    builds = defaultdict(dict)
+    for (arch, content), copies in sorted(contents.items()):
+        platform = platforms.setdefault(arch, {"identical": [], "conflicts": [], "redundant_bytes": 0})
+        size = copies[0]["size"]
+        for soname in {copy["soname"] for copy in copies} - {None}:
+            builds[arch, soname][content] = copies
+        if len(copies) > 1:
+            redundant = size * (len(copies) - 1)
+            platform["identical"].append(
+                {
+                    "soname": next((c["soname"] for c in copies if c["soname"]), None),
+                    "sha256": content,
+                    "size": size,
+                    "redundant_bytes": redundant,
+                    "copies": [{"wheel": c["wheel"], "member": c["member"]} for c in copies],
+                }
+            )
+            platform["redundant_bytes"] += redundant
+    for (arch, soname), variants in sorted(builds.items()):
+        if len(variants) > 1:
+            platforms[arch]["conflicts"].append(
+                {
+                    "soname": soname,
+                    "builds": [
+                        {
+                            "size": copies[0]["size"],
+                            "copies": [{"wheel": c["wheel"], "member": c["member"]} for c in copies if c["soname"] == soname],
+                        }
+                        for copies in variants.values()
+                    ],
+                }
+            )
+    for platform in platforms.values():
+        platform["identical"].sort(key=lambda group: (-group["redundant_bytes"], group["soname"] or ""))
+    return {
+        "platforms": platforms,
+        "redundant_bytes": sum(platform["redundant_bytes"] for platform in platforms.values()),
+    }
+
+
+def print_duplicates(duplicates: dict) -> None:
+    for arch, platform in sorted(duplicates["platforms"].items()):
+        if not platform["identical"] and not platform["conflicts"]:
+            continue
+        print(f"\n[{arch.upper()}] - {platform['redundant_bytes'] / 1e6:.2f} MB redundant")
+        for group in platform["identical"]:
+            name = group["soname"] or os.path.basename(group["copies"][0]["member"])
+            print(
+                f"  SAME    {name}: {len(group['copies'])} copies of {group['size'] / 1e6:.2f} MB, "
+                f"{group['redundant_bytes'] / 1e6:.2f} MB redundant"
+            )
+            for copy in group["copies"]:
+                print(f"            {copy['wheel']}:{copy['member']}")
+        for conflict in platform["conflicts"]:
+            print(f"  DIFFER  {conflict['soname']}: {len(conflict['builds'])} different builds")
+            for build in conflict["builds"]:
+                where = ", ".join(f"{c['wheel']}:{c['member']}" for c in build["copies"])
+                print(f"            {build['size'] / 1e6:.2f} MB in {where}")
+    print(f"\nBundled libraries shipped more than once: {duplicates['redundant_bytes'] / 1e6:.2f} MB redundant in total.")
+
+
+def process_wheels(wheel_dir: str, jobs: int = 1, use_readelf: bool = False):
+    scans = scan_wheel_dir(wheel_dir, jobs, use_readelf)
+    if not scans:
+        return None
+    arch_summary = consolidate(scans)
+    print_consolidated(arch_summary)
+    return arch_summary
 
 
 if __name__ == "__main__":
@@ -105,5 +433,107 @@ if __name__ == "__main__":
         default=os.getcwd(),
         help="Directory containing .whl files (default: current working directory).",
     )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Worker processes for scanning (default: number of CPUs).",
+    )
+    parser.add_argument(
+        "--readelf",
+        action="store_true",
+        help="Extract each .so and run readelf instead of parsing it in-process.",
+    )
+    parser.add_argument(
+        "--json",
+        dest="json_path",
+        help="Write the wheel -> .so -> NEEDED -> provider graph as JSON.",
+    )
+    parser.add_argument(
+        "--report",
+        help="Write the dependency graph as a text report ('-' for stdout).",
+    )
+    parser.add_argument(
+        "--runtime-lib",
+        action="append",
+        default=[],
+        metavar="PATTERN",
+        help="Glob of a library provided by the p4a distribution itself "
+        f"(repeatable, always includes: {', '.join(DEFAULT_RUNTIME_LIBS)}).",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Parse every library again instead of using the scan cache.",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=default_cache_dir(),
+        help="Where the scan cache lives (default: %(default)s).",
+    )
+    parser.add_argument(
+        "--cache-max-mb",
+        type=float,
+        default=DEFAULT_CACHE_MAX_MB,
+        help=f"Evict least recently used cache entries beyond this size (default: {DEFAULT_CACHE_MAX_MB}).",
+    )
+    parser.add_argument(
+        "--duplicates",
+        action="store_true",
+        help="Report bundled libraries shipped more than once per platform "
+        "(identical copies and different builds of one SONAME).",
+    )
+    parser.add_argument(
+        "--fail-on-unresolved",
+        action="store_true",
+        help="Exit with status 1 if any NEEDED entry has no provider.",
+    )
     args = parser.parse_args()
-    process_wheels(args.wheel_dir)
+
+    # readelf output has no SONAME/RUNPATH, so it never feeds the cache.
+    cache = None
+    if not args.no_cache and not args.readelf:
+        cache = ElfCache(args.cache_dir / "elf-scan.json", int(args.cache_max_mb * 1024 * 1024))
+
+    scans = scan_wheel_dir(args.wheel_dir, args.jobs, args.readelf, cache)
+    if cache is not None:
+        cache.save()
+    if scans:
+        print_consolidated(consolidate(scans))
+
+        graph = build_dependency_graph(scans, DEFAULT_RUNTIME_LIBS + tuple(args.runtime_lib))
+        duplicates = None
+        if args.duplicates:
+            duplicates = find_duplicates(args.wheel_dir, scans, args.jobs)
+            graph["duplicates"] = duplicates
+        if args.json_path:
+            with open(args.json_path, "w", encoding="utf-8") as f:
+                json.dump(graph, f, indent=2)
+                f.write("\n")
+        if args.report == "-":
+            print("\n" + format_dependency_report(graph))
+        elif args.report:
+            with open(args.report, "w", encoding="utf-8") as f:
+                f.write(format_dependency_report(graph))
+
+        print("\n" + "=" * 60)
+        print("UNRESOLVED AND UNUSED LIBRARIES PER ARCHITECTURE")
+        print("=" * 60)
+        unresolved = print_problems(graph)
+        if unresolved == 0:
+            print("\nEvery NEEDED library has a provider.")
+
+        if duplicates is not None:
+            print("\n" + "=" * 60)
+            print("DUPLICATE BUNDLED LIBRARIES PER ARCHITECTURE")
+            print("=" * 60)
+            print_duplicates(duplicates)
+
+        if cache is not None:
+            total = cache.hits + cache.misses
+            rate = 100 * cache.hits / total if total else 0
+            print(f"\nScan cache: {cache.hits} hits, {cache.misses} misses ({rate:.0f}% hit rate) in {cache.path}")
+        if unresolved and args.fail_on_unresolved:
+            raise SystemExit(1)
@@ -1,19 +1,28 @@
+import argparse
+import ast
 import importlib
-
+import importlib.util
 import inspect
+import json
+import os
 from pathlib import Path
-import pythonforandroid
-from pythonforandroid.recipe import (
-    Recipe,
-    PyProjectRecipe,
-    MesonRecipe,
-    RustCompiledComponentsRecipe,
-)
 
-P4A_PATH = Path(pythonforandroid.__file__).resolve().parent
-RECIPES_DIR = P4A_PATH / "recipes"
+from cache_paths import default_cache_dir
 
-BASES = (PyProjectRecipe, MesonRecipe, RustCompiledComponentsRecipe)
+BASE_MODULE = "pythonforandroid.recipe"
+BASE_NAMES = ("PyProjectRecipe", "MesonRecipe", "RustCompiledComponentsRecipe")
+SCAN_CACHE_VERSION = 2
+# Class attributes kept for the catalog; RecipeMeta stores version/url as _version/_url.
+CLASS_ATTRS = {
+    "version": "version",
+    "_version": "version",
+    "url": "url",
+    "_url": "url",
+    "depends": "depends",
+    "opt_depends": "opt_depends",
+}
+# Relative build cost by base when no measured costs are given.
+BASE_COSTS = {"RustCompiledComponentsRecipe": 4, "MesonRecipe": 2, "PyProjectRecipe": 1}
 
 BLACKLIST = {
     "libcairo",
@@ -33,13 +42,23 @@ BLACKLIST = {
 }  # add more if needed
 
 
-def find_recipes():
-    for recipe_dir in RECIPES_DIR.iterdir():
+def find_p4a() -> Path:
+    """Locate the pythonforandroid package without importing it."""
+    spec = importlib.util.find_spec("pythonforandroid")
+    if spec is None or not spec.submodule_search_locations:
+        raise SystemExit("pythonforandroid is not installed")
+    return Path(spec.submodule_search_locations[0]).resolve()
+
+
+def find_recipes(recipes_dir: Path):
+    for recipe_dir in recipes_dir.iterdir():
         if recipe_dir.is_dir() and (recipe_dir / "__init__.py").exists():
             yield recipe_dir.name
 
 
 def load_recipe(recipe_name):
+    from pythonforandroid.recipe import Recipe
+
     try:
         module = importlib.import_module(f"pythonforandroid.recipes.{recipe_name}")
     except ModuleNotFoundError as e:
@@ -56,12 +75,14 @@ def load_recipe(recipe_name):
     return None
 
 
-def main():
-    print(f"Scanning recipes from: {RECIPES_DIR}\n")
+def import_matches(recipes_dir: Path) -> tuple[list, list]:
+    """The original path: import every recipe module and inspect its classes."""
+    from pythonforandroid import recipe as base_module
+
+    bases = [getattr(base_module, name) for name in BASE_NAMES]
     matches = []
     skipped = []
-
-    for name in sorted(find_recipes()):
+    for name in sorted(find_recipes(recipes_dir)):
         if name in BLACKLIST:
             skipped.append(name)
             continue
@@ -71,9 +92,387 @@ def main():
             skipped.append(name)
             continue
 
-        base = next((b.__name__ for b in BASES if issubclass(cls, b)), None)
+        base = next((b.__name__ for b in bases if issubclass(cls, b)), None)
         if base:
             matches.append((name, cls.__name__, base))
+    return matches, skipped
+
+
+def dotted_name(node) -> str | None:
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        parent = dotted_name(node.value)
+        return f"{parent}.{node.attr}" if parent else None
+    return None
+
+
+def class_attrs(node: ast.ClassDef) -> dict:
+    """Literal values of CLASS_ATTRS assigned in a class body.
+
+    Computed values (e.g. ``depends = Base.depends + [...]``) are left out,
+    so lookups fall through to the base class.
+    """
+    attrs = {}
+    for stmt in node.body:
+        if isinstance(stmt, ast.Assign) and len(stmt.targets) == 1:
+            target, value = stmt.targets[0], stmt.value
+        elif isinstance(stmt, ast.AnnAssign) and stmt.value is not None:
+            target, value = stmt.target, stmt.value
+        else:
+            continue
+        if not isinstance(target, ast.Name) or target.id not in CLASS_ATTRS:
+            continue
+        try:
+            # round-trip through JSON so tuples match what the cache gives back
+            attrs[CLASS_ATTRS[target.id]] = json.loads(json.dumps(ast.literal_eval(value)))
+        except (ValueError, TypeError, SyntaxError):
+            pass
+    return attrs
+
+
+def parse_module(path: Path) -> dict:
+    """Top-level classes, imports and the ``recipe = X()`` instance of a module."""
+    tree = ast.parse(path.read_bytes(), str(path))
+    classes = {}
+    imports = {}
+    instance = None
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef):
+            classes[node.name] = {
+                "bases": [b for b in map(dotted_name, node.bases) if b],
+                "attrs": class_attrs(node),
+            }
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            for alias in node.names:
+                imports[alias.asname or alias.name] = [node.module, alias.name]
+        elif isinstance(node, ast.Import):
+            for alias in node.names:
+                imports[alias.asname or alias.name] = [alias.name, None]
+        elif (
+            isinstance(node, ast.Assign)
+            and any(isinstance(t, ast.Name) and t.id == "recipe" for t in node.targets)
+            and isinstance(node.value, ast.Call)
+        ):
+            instance = dotted_name(node.value.func)
+    return {"classes": classes, "imports": imports, "recipe": instance}
+
+
+class RecipeScanner:
+    """Find each recipe's class and its p4a base class from source alone.
+
+    Base classes are followed through ``from ... import`` into other recipe
+    modules and pythonforandroid/recipe.py. Parsed modules are cached by
+    path, mtime and size.
+    """
+
+    def __init__(self, p4a_path: Path, cache_path: Path | None = None):
+        self.p4a_path = p4a_path
+        self.cache_path = cache_path
+        self.cache = {}
+        self.dirty = False
+        self.modules = {}
+        if cache_path is not None:
+            try:
+                data = json.loads(cache_path.read_text())
+                if data.get("version") == SCAN_CACHE_VERSION:
+                    self.cache = data["files"]
+            except (OSError, ValueError, KeyError):
+                pass
+
+    def module_path(self, module: str) -> Path | None:
+        parts = module.split(".")
+        if parts[0] != "pythonforandroid":
+            return None
+        base = self.p4a_path.joinpath(*parts[1:])
+        for candidate in (base / "__init__.py", base.with_suffix(".py")):
+            if candidate.is_file():
+                return candidate
+        return None
+
+    def module(self, module: str) -> dict | None:
+        if module not in self.modules:
+            path = self.module_path(module)
+            self.modules[module] = self.parse(path) if path else None
+        return self.modules[module]
+
+    def parse(self, path: Path) -> dict | None:
+        st = path.stat()
+        key = str(path)
+        cached = self.cache.get(key)
+        if cached and cached["mtime_ns"] == st.st_mtime_ns and cached["size"] == st.st_size:
+            return cached["info"]
+        try:
+            info = parse_module(path)
+        except SyntaxError as e:
+            print(f"[WARN] {path}: cannot parse ({e})")
+            info = None
+        self.cache[key] = {"mtime_ns": st.st_mtime_ns, "size": st.st_size, "info": info}
+        self.dirty = True
+        return info
+
+    def resolve(self, module: str, name: str, depth: int = 0) -> tuple[str, str] | None:
+        """Where the class ``name`` seen in ``module`` is defined."""
+        info = self.module(module)
+        if info is None or depth > 20:
+            return None
+        head, _, rest = name.partition(".")
+        if not rest and head in info["classes"]:
+            return module, head
+        if head in info["imports"]:
+            source, imported = info["imports"][head]
+            if rest:
+                target = f"{source}.{imported}" if imported else source
+                return self.resolve(target, rest, depth + 1)
+            if imported:
+                # ``from pkg import mod`` or ``from mod import Class``
+                if self.module_path(f"{source}.{imported}"):
+                    return None
+                return self.resolve(source, imported, depth + 1)
+        return None
+
+    def lineage(self, module: str, name: str) -> list[tuple[str, str]]:
+        """The class and its resolvable bases, depth-first in declaration order."""
+        order = []
+        todo = [(module, name)]
+        while todo:
+            current = todo.pop()
+            if current in order:
+                continue
+            order.append(current)
+            bases = self.module(current[0])["classes"][current[1]]["bases"]
+            resolved = [self.resolve(current[0], base) for base in bases]
+            todo.extend(reversed([r for r in resolved if r]))
+        return order
+
+    def attribute(self, lineage, attr: str, default=None):
+        for module, name in lineage:
+            attrs = self.module(module)["classes"][name]["attrs"]
+            if attr in attrs:
+                return attrs[attr]
+        return default
+
+    def recipe_class(self, recipe_name: str) -> tuple[str, str] | None:
+        module = f"pythonforandroid.recipes.{recipe_name}"
+        info = self.module(module)
+        if info is None or not info["recipe"]:
+            return None
+        return self.resolve(module, info["recipe"])
+
+    def match(self, recipe_name: str) -> tuple[str, str | None] | None:
+        """(class name, first matching base name) or None if no recipe class."""
+        found = self.recipe_class(recipe_name)
+        if found is None:
+            return None
+        ancestry = set(self.lineage(*found))
+        base = next((b for b in BASE_NAMES if (BASE_MODULE, b) in ancestry), None)
+        return found[1], base
+
+    def describe(self, recipe_name: str) -> dict | None:
+        """Class, p4a base, version, url and dependencies of a recipe."""
+        found = self.recipe_class(recipe_name)
+        if found is None:
+            return None
+        lineage = self.lineage(*found)
+        ancestry = set(lineage)
+        return {
+            "class": found[1],
+            "base": next((b for b in BASE_NAMES if (BASE_MODULE, b) in ancestry), None),
+            # nearest class from pythonforandroid/recipe.py, for skip reasons
+            "p4a_base": next((n for m, n in lineage[1:] if m == BASE_MODULE), None),
+            "version": self.attribute(lineage, "version"),
+            "url": self.attribute(lineage, "url"),
+            "depends": self.attribute(lineage, "depends", []),
+            "opt_depends": self.attribute(lineage, "opt_depends", []),
+        }
+
+    def save(self):
+        if self.cache_path is None or not self.dirty:
+            return
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.cache_path.with_name(self.cache_path.name + ".tmp")
+        tmp.write_text(json.dumps({"version": SCAN_CACHE_VERSION, "files": self.cache}))
+        os.replace(tmp, self.cache_path)
+
+
+def first_alternatives(depends) -> list[str]:
+    """Dependency names, taking the first option of ``("sdl2", "sdl3")`` style tuples."""
+    names = []
+    for dep in depends or []:
+        if isinstance(dep, list):
+            dep = dep[0] if dep else None
+        if isinstance(dep, str) and dep not in names:
+            names.append(dep)
+    return names
+
+
+def build_catalog(recipes_dir: Path, scanner: RecipeScanner) -> dict:
+    """Wheel recipes with their dependencies and closure, plus why others were skipped."""
+    dirs = {name.lower(): name for name in find_recipes(recipes_dir)}
+    infos = {}
+
+    def describe(name):
+        if name not in infos:
+            infos[name] = scanner.describe(name) if name in dirs.values() else None
+        return infos[name]
+
+    def closure(name):
+        seen = set()
+        todo = [name]
+        while todo:
+            info = describe(todo.pop())
+            for dep in first_alternatives(info["depends"] if info else []):
+                dep = dirs.get(dep.lower(), dep)
+                if dep != name and dep not in seen:
+                    seen.add(dep)
+                    todo.append(dep)
+        return sorted(seen)
+
+    recipes = {}
+    skipped = {}
+    for name in sorted(dirs.values()):
+        if name in BLACKLIST:
+            skipped[name] = "in BLACKLIST"
+            continue
+        info = describe(name)
+        if info is None:
+            skipped[name] = "no resolvable `recipe = ...` instance"
+            continue
+        if not info["base"]:
+            skipped[name] = f"{info['class']} is a {info['p4a_base'] or 'plain'} recipe, not a wheel recipe"
+            continue
+        entry = {k: v for k, v in info.items() if k != "p4a_base"}
+        entry["closure"] = closure(name)
+        recipes[name] = entry
+    scanner.save()
+    return {"p4a": str(scanner.p4a_path), "recipes": recipes, "skipped": skipped}
+
+
+def partition(catalog: dict, shards: int, costs: dict | None = None, names=None) -> list[dict]:
+    """Split the wheel recipes (or just ``names``) over ``shards``.
+
+    A shard builds its recipes plus their dependency closures, so a dependency
+    shared inside one shard is only paid once. Recipes are placed greedily,
+    longest first, then moved between shards while that shortens the slowest
+    one. ``costs`` (e.g. measured seconds) overrides the per-base estimates
+    in BASE_COSTS.
+    """
+    recipes = catalog["recipes"]
+    if names is not None:
+        recipes = {name: recipes[name] for name in names}
+    default = sorted(costs.values())[len(costs) // 2] if costs else 1
+
+    def cost(name):
+        if costs:
+            return costs.get(name, default)
+        entry = recipes.get(name)
+        return BASE_COSTS.get(entry["base"], 1) if entry else 1
+
+    def total(names):
+        return sum(cost(n) for n in names)
+
+    bins = [{"recipes": [], "build": set(), "cost": 0} for _ in range(max(shards, 1))]
+    for name in sorted(recipes, key=lambda n: (-total({n, *recipes[n]["closure"]}), n)):
+        needed = {name, *recipes[name]["closure"]}
+        best = min(bins, key=lambda b: (b["cost"] + total(needed - b["build"]), len(b["recipes"])))
+        best["cost"] += total(needed - best["build"])
+        best["build"] |= needed
+        best["recipes"].append(name)
+
+    def shard_cost(members):
+        return total({n for m in members for n in (m, *recipes[m]["closure"])})
+
+    improved = True
+    while improved and len(bins) > 1:
+        improved = False
+        slowest = max(bins, key=lambda b: b["cost"])
+        for name in sorted(slowest["recipes"], key=lambda n: -cost(n)):
+            rest = [n for n in slowest["recipes"] if n != name]
+            for other in bins:
+                if other is slowest:
+                    continue
+                moved = shard_cost(other["recipes"] + [name])
+                if max(moved, shard_cost(rest)) < slowest["cost"]:
+                    other["recipes"].append(name)
+                    slowest["recipes"] = rest
+                    for b in (slowest, other):
+                        b["build"] = {n for m in b["recipes"] for n in (m, *recipes[m]["closure"])}
+                        b["cost"] = shard_cost(b["recipes"])
+                    improved = True
+                    break
+            if improved:
+                break
+    return [
+        {"recipes": sorted(b["recipes"]), "build": sorted(b["build"]), "cost": b["cost"]}
+        for b in bins
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List p4a recipes that build wheels.")
+    parser.add_argument(
+        "--import",
+        dest="use_import",
+        action="store_true",
+        help="Import every recipe module instead of parsing the sources.",
+    )
+    parser.add_argument("--no-cache", action="store_true", help="Do not read or write the scan cache.")
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=None,
+        help="Scan cache directory (default: $XDG_CACHE_HOME/p4a-wheels).",
+    )
+    parser.add_argument(
+        "--json",
+        metavar="PATH",
+        help="Write the recipe catalog (class, base, version, depends, closure, "
+        "skip reasons, shards) as JSON; '-' for stdout.",
+    )
+    parser.add_argument("--shards", type=int, default=1, help="Split the recipes over N CI shards (default: 1).")
+    parser.add_argument(
+        "--costs",
+        type=Path,
+        help="JSON object of recipe name to build cost (e.g. seconds) used for sharding.",
+    )
+    parser.add_argument(
+        "--shard",
+        type=int,
+        metavar="I",
+        help="Only print the recipes of shard I (0-based), space separated.",
+    )
+    args = parser.parse_args()
+    if args.use_import and (args.json or args.shard is not None):
+        parser.error("--json and --shard need the source scanner, not --import")
+    if args.shard is not None and not 0 <= args.shard < args.shards:
+        parser.error(f"--shard must be between 0 and {args.shards - 1}")
+
+    p4a_path = find_p4a()
+    recipes_dir = p4a_path / "recipes"
+    quiet = args.shard is not None or args.json == "-"
+    if not quiet:
+        print(f"Scanning recipes from: {recipes_dir}\n")
+
+    if args.use_import:
+        matches, skipped = import_matches(recipes_dir)
+    else:
+        cache_path = None if args.no_cache else (args.cache_dir or default_cache_dir()) / "recipe-scan.json"
+        catalog = build_catalog(recipes_dir, RecipeScanner(p4a_path, cache_path))
+        costs = json.loads(args.costs.read_text()) if args.costs else None
+        catalog["shards"] = partition(catalog, args.shards, costs)
+        matches = [(name, e["class"], e["base"]) for name, e in catalog["recipes"].items()]
+        skipped = list(catalog["skipped"])
+
+        if args.json:
+            text = json.dumps(catalog, indent=2) + "\n"
+            if args.json == "-":
+                print(text, end="")
+            else:
+                Path(args.json).write_text(text)
+        if args.shard is not None:
+            print(" ".join(catalog["shards"][args.shard]["recipes"]))
+        if quiet:
+            return
 
     print(f"Matching recipes ({len(matches)}):\n")
 
@@ -1,28 +1,114 @@
 import sys
 import os
+import re
+import glob
+import hashlib
+import time
+import shutil
+import zipfile
+import functools
+import multiprocessing
+import subprocess
 from argparse import ArgumentParser
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from urllib.parse import urlparse
 
-from pythonforandroid.recipe import Recipe
-from pythonforandroid.logger import setup_color, info_main, Colo_Fore, info
+from pythonforandroid.recipe import Recipe, PyProjectRecipe
+from pythonforandroid.logger import setup_color, info_main, Colo_Fore, info, error
 from pythonforandroid.build import Context
 from pythonforandroid.graph import get_recipe_order_and_bootstrap
 from pythonforandroid.util import ensure_dir
 from pythonforandroid.bootstraps.empty import bootstrap
 from pythonforandroid.distribution import Distribution
 from pythonforandroid.androidndk import AndroidNDK
+from pythonforandroid.archs import Arch
+
+from build_scheduler import (
+    BuildScheduler,
+    InlineExecutor,
+    dependency_closure,
+    recipe_dependencies,
+    OK,
+    FAILED,
+    SKIPPED,
+)
+from build_cache import WheelCache, cache_key, hash_sources, hash_tree, ndk_version
+from build_profile import PhaseProfiler, NullProfiler
+from download_cache import DownloadCache
+import build_history
+import slim_wheels
+from compiler_cache import CompilerCache, TOOLS as COMPILER_CACHE_TOOLS
+from cache_paths import default_cache_dir
 
 DEFAULT_RECIPES = ["sdl3", "libbz2", "liblzma"]
+# Recipes that leave state on the Context (ctx.hostpython, ctx.python_recipe)
+# which Python recipes built after them rely on.
+PYTHON_CHAIN = ("hostpython3", "python3")
 NDK_DIR = os.environ["NDK_DIR"]
 
+# Set before the worker pool forks, so workers inherit the prepared context.
+_BUILDER = None
+
+
+def _build_in_worker(name, arch_name):
+    return _BUILDER.build_recipe_logged(name, arch_name)
+
+
+def _forward_sccache_env(get_env):
+    """p4a only copies CCACHE_* into recipe environments; sccache needs its own."""
+
+    @functools.wraps(get_env)
+    def wrapper(self, *args, **kwargs):
+        env = get_env(self, *args, **kwargs)
+        env.update(
+            {k: v for k, v in os.environ.items() if k.startswith("SCCACHE_") or k == "RUSTC_WRAPPER"}
+        )
+        return env
+
+    return wrapper
+
 
 class RecipeBuilder:
     def __init__(self, parsed_args):
         setup_color(True)
-        self.build_dir = parsed_args.workdir
+        # Absolute, because prepare_build_dir chdirs on the main thread while
+        # prefetch threads are still writing into packages_path.
+        self.build_dir = os.path.abspath(parsed_args.workdir)
+        self.jobs = parsed_args.jobs
+        self.log_dir = parsed_args.log_dir or os.path.join(self.build_dir, "logs")
+        self.wheel_cache = WheelCache(parsed_args.wheel_cache) if parsed_args.wheel_cache else None
+        # arch -> recipe -> {"key", "inputs", "wheels"}, filled by plan_cache
+        self.cache_plan = {}
+        self.download_cache = DownloadCache(parsed_args.download_cache)
+        self.download_jobs = parsed_args.download_jobs
+        self.skip_downloads = parsed_args.skip_downloads
+        self.downloads = {}
+        self.profile_path = parsed_args.profile
+        self.trace_path = parsed_args.trace
+        self.history_path = parsed_args.history
+        self.slim = parsed_args.slim
+        self.compiler_cache = None
+        self.compiler_cache_summary = []
+        if parsed_args.compiler_cache:
+            self.compiler_cache = CompilerCache(
+                parsed_args.compiler_cache,
+                parsed_args.compiler_cache_dir or default_cache_dir() / "compiler",
+                parsed_args.compiler_cache_size,
+            )
+            if parsed_args.compiler_cache == "sccache":
+                Arch.get_env = _forward_sccache_env(Arch.get_env)
+        self.started = time.time()
+        if self.profile_path or self.trace_path or self.history_path:
+            self.profiler = PhaseProfiler()
+        else:
+            self.profiler = NullProfiler()
         self.init_context(parsed_args)
-        self.build_recipes(
-            set(parsed_args.recipes + DEFAULT_RECIPES), parsed_args.arch
-        )
+        recipes = set(parsed_args.recipes + DEFAULT_RECIPES)
+        if parsed_args.parallel_archs and len(parsed_args.arch) > 1:
+            self.build_archs_parallel(parsed_args, recipes)
+        else:
+            self.build_recipes(recipes, parsed_args.arch)
 
     def init_context(self, parse_args):
         self.ctx = Context()
@@ -46,8 +132,8 @@ class RecipeBuilder:
 
         return v_recipe
 
-    def build_recipes(self, recipes, archs):
-
+    def prepare_recipes(self, recipes, archs):
+        """Resolve the build order, set up the context and start downloading sources."""
         recipes = self.parse_recipes(recipes)
         info_main(f"# Requested recipes: {Colo_Fore.BLUE}{recipes}")
 
@@ -68,33 +154,493 @@ class RecipeBuilder:
         recipes = [Recipe.get_recipe(recipe, self.ctx) for recipe in _recipes]
 
         self.ctx.recipe_build_order = _recipes
+        self.start_downloads(recipes)
+        return recipes
+
+    def start_downloads(self, recipes):
+        """Fetch sources on a thread pool; builds call wait_download per recipe."""
+        self.download_pool = ThreadPoolExecutor(self.download_jobs)
+        if self.skip_downloads:
+            # Nothing queued, so wait_download never runs p4a's download step.
+            return
         for recipe in recipes:
-            recipe.download_if_necessary()
+            self.downloads[recipe.name] = self.download_pool.submit(self.prefetch, recipe)
+
+    def prefetch(self, recipe):
+        """Put an http(s) source and its .mark file in packages_path via the cache.
+
+        git sources, P4A_<name>_DIR overrides and recipes without a URL are
+        left to p4a's download step.
+        """
+        if os.environ.get("P4A_{}_DIR".format(recipe.name.lower())) is not None:
+            return
+        url = recipe.versioned_url
+        if not url or urlparse(url).scheme not in ("http", "https"):
+            return
+        # Expected sums from recipe attributes or a #alg= URL fragment, as p4a does.
+        digests = {}
+        for alg in set(hashlib.algorithms_guaranteed) | {"md5", "sha512", "blake2b"}:
+            expected = getattr(recipe, alg + "sum", None)
+            fragment = re.match(r"^(.+)#" + alg + r"=([0-9a-f]{32,})$", url)
+            if fragment:
+                url, expected = fragment.group(1), fragment.group(2)
+            if expected:
+                digests[alg] = expected
+        with self.profiler.phase("download", recipe.name):
+            self.download_cache.install(
+                url,
+                os.path.join(self.ctx.packages_path, recipe.name),
+                digests,
+                recipe.download_headers or (),
+            )
+
+    def wait_download(self, recipe):
+        """Block until the recipe's sources are in packages_path."""
+        future = self.downloads.pop(recipe.name, None)
+        if future is None:
+            return
+        future.result()
+        # Finds the prefetched file (checking its sums again), or downloads
+        # what prefetch skipped.
+        recipe.download_if_necessary()
+
+    def wait_downloads(self, recipes):
+        for recipe in recipes:
+            self.wait_download(recipe)
+        self.download_pool.shutdown()
+
+    def build_recipes(self, recipes, archs):
+        recipes = self.prepare_recipes(recipes, archs)
+
+        try:
+            if self.jobs > 1:
+                self.build_parallel(recipes)
+            else:
+                self.build_serial(recipes)
+            if self.slim:
+                self.slim_wheels()
+        finally:
+            if self.wheel_cache is not None:
+                info_main(self.wheel_cache.report())
+            for line in self.compiler_cache_summary:
+                info_main(line)
+            self.write_profile()
+
+    def start_compiler_cache(self, arch):
+        if self.compiler_cache is None:
+            return
+        self.ctx.ccache = self.compiler_cache.binary
+        self.compiler_cache.activate(arch.arch, self.ctx.ndk_api, self.build_dir)
+        info_main("# Using {} in {}".format(
+            self.compiler_cache.tool, self.compiler_cache.cache_dir(arch.arch, self.ctx.ndk_api)))
+
+    def finish_compiler_cache(self, arch):
+        if self.compiler_cache is None:
+            return
+        stats = self.compiler_cache.stats()
+        self.compiler_cache_summary.append(
+            self.compiler_cache.summary(arch.arch, self.ctx.ndk_api, stats)
+        )
+        self.compiler_cache.stop()
+
+    def slim_wheels(self):
+        """Strip and prune the wheels this run wrote to save_wheel_dir.
 
+        Only wheels tagged for this run's archs are touched: another
+        recipebuild.py may be writing wheels for other archs to the same dir.
+        """
+        tags = tuple(
+            "-{}.whl".format(tag)
+            for arch in self.ctx.archs
+            for tag in PyProjectRecipe.get_wheel_platform_tags(arch.arch, self.ctx)
+        )
+        wheels = [
+            path
+            for path in glob.glob(os.path.join(self.ctx.save_wheel_dir, "*.whl"))
+            if path.endswith(tags) and os.path.getmtime(path) >= self.started
+        ]
+        info_main("# Slimming {} wheels".format(len(wheels)))
+        llvm_strip = slim_wheels.find_llvm_strip(NDK_DIR)
+        slim_wheels.slim_wheels(
+            wheels, llvm_strip, slim_wheels.DEFAULT_EXCLUDES, level=9, jobs=os.cpu_count() or 1
+        )
+
+    def write_profile(self):
+        if self.profile_path:
+            self.profiler.write(self.profile_path)
+            info_main("Build profile written to {}".format(self.profile_path))
+        if self.trace_path:
+            self.profiler.write_trace(self.trace_path)
+            info_main("Build trace written to {}".format(self.trace_path))
+        if self.profiler.records:
+            info(self.profiler.summary())
+        if self.history_path:
+            self.update_history()
+
+    def update_history(self):
+        """Record how long each recipe that was really built took, per arch."""
+        totals = {}
+        finished = set()
+        for r in self.profiler.records:
+            if r["phase"] in ("unpack", "prebuild", "build", "install_libraries"):
+                key = (r["recipe"], r["arch"])
+                totals[key] = totals.get(key, 0) + r["wall"]
+                if r["phase"] == "install_libraries":
+                    finished.add(key)
+        samples = [(name, arch, totals[name, arch]) for name, arch in sorted(finished)]
+        if samples:
+            build_history.update(self.history_path, samples)
+            info_main("Recorded {} build times in {}".format(len(samples), self.history_path))
+
+    def build_serial(self, recipes):
         for arch in self.ctx.archs:
             info_main("# Building all recipes for arch {}".format(arch.arch))
+            self.start_compiler_cache(arch)
+            try:
+                self.build_serial_arch(recipes, arch)
+            finally:
+                self.finish_compiler_cache(arch)
+
+    def build_serial_arch(self, recipes, arch):
+        self.plan_cache(recipes, arch)
+        to_build = [r for r in recipes if not self.cached_wheels(r, arch)]
 
-            info_main("# Unpacking recipes")
-            for recipe in recipes:
+        info_main("# Unpacking recipes")
+        for recipe in to_build:
+            # Unpack whatever is fetched while the rest keeps downloading.
+            self.wait_download(recipe)
+            with self.profiler.phase("unpack", recipe.name, arch.arch):
                 ensure_dir(recipe.get_build_container_dir(arch.arch))
                 recipe.prepare_build_dir(arch.arch)
 
-            info_main("# Prebuilding recipes")
-            # 2) prebuild packages
-            for recipe in recipes:
-                info_main("Prebuilding {} for {}".format(recipe.name, arch.arch))
+        self.wait_downloads(recipes)
+
+        info_main("# Prebuilding recipes")
+        # 2) prebuild packages
+        for recipe in to_build:
+            info_main("Prebuilding {} for {}".format(recipe.name, arch.arch))
+            with self.profiler.phase("prebuild", recipe.name, arch.arch):
                 recipe.prebuild_arch(arch)
                 recipe.apply_patches(arch)
 
-            info_main("# Building recipes")
-            for recipe in recipes:
-                info_main("Building {} for {}".format(recipe.name, arch.arch))
+        info_main("# Building recipes")
+        for recipe in recipes:
+            if self.cached_wheels(recipe, arch):
+                with self.profiler.phase("restore", recipe.name, arch.arch):
+                    self.restore_cached(recipe, arch)
+                continue
+            info_main("Building {} for {}".format(recipe.name, arch.arch))
+            started = time.time()
+            with self.profiler.phase("build", recipe.name, arch.arch):
                 # recipe.build_arch(arch)
                 if recipe.should_build(arch):
                     recipe.build_arch(arch)
                 else:
                     info("{} said it is already built, skipping".format(recipe.name))
+            with self.profiler.phase("install_libraries", recipe.name, arch.arch):
                 recipe.install_libraries(arch)
+            self.store_built(recipe, arch, started)
+
+    def cache_inputs(self, recipe, arch_name, dep_keys):
+        """Everything that decides what the recipe's wheel for this arch contains."""
+        return {
+            "recipe": recipe.name,
+            "version": recipe.version,
+            "url": recipe.versioned_url,
+            # the recipe's __init__.py and its patches
+            "recipe_files": hash_tree(recipe.get_recipe_dir()),
+            "p4a": hash_tree(sys.modules[Recipe.__module__].__file__),
+            "sources": hash_sources(os.path.join(self.ctx.packages_path, recipe.name)),
+            "depends": dep_keys,
+            "ndk": ndk_version(NDK_DIR),
+            "min_api": self.ctx.ndk_api,
+            "python": Recipe.get_recipe("python3", self.ctx).version,
+            "arch": arch_name,
+        }
+
+    def plan_cache(self, recipes, arch):
+        """Compute cache keys in build order and look up the cacheable recipes."""
+        if self.wheel_cache is None:
+            return
+        names = {recipe.name for recipe in recipes}
+        plan = self.cache_plan[arch.arch] = {}
+        for recipe in recipes:
+            # The key hashes the sources, so they have to be here first.
+            self.wait_download(recipe)
+            deps = recipe_dependencies(
+                recipe.name, recipe.depends, recipe.opt_depends, names
+            )
+            inputs = self.cache_inputs(
+                recipe, arch.arch, {dep: plan[dep]["key"] for dep in sorted(deps)}
+            )
+            key = cache_key(inputs)
+            wheels = None
+            # Only pyproject recipes produce a wheel that fully captures the build.
+            if isinstance(recipe, PyProjectRecipe):
+                wheels = self.wheel_cache.lookup(arch.arch, recipe.name, key)
+            plan[recipe.name] = {"key": key, "inputs": inputs, "wheels": wheels}
+
+    def cached_wheels(self, recipe, arch):
+        return self.cache_plan.get(arch.arch, {}).get(recipe.name, {}).get("wheels")
+
+    def restore_cached(self, recipe, arch):
+        """Install a cache hit like PyProjectRecipe.install_wheel would."""
+        wheels = self.cached_wheels(recipe, arch)
+        if not wheels:
+            return False
+        info_main("Restoring {} for {} from the wheel cache".format(recipe.name, arch.arch))
+        dev_wheel_dir = os.environ.get("P4A_WHEEL_DIR")
+        if dev_wheel_dir:
+            ensure_dir(dev_wheel_dir)
+        destination = self.ctx.get_python_install_dir(arch.arch)
+        for wheel in wheels:
+            for wheel_dir in (dev_wheel_dir, self.ctx.save_wheel_dir):
+                if wheel_dir and os.path.isdir(wheel_dir):
+                    shutil.copy(wheel, wheel_dir)
+            with zipfile.ZipFile(wheel) as zf:
+                zf.extractall(destination)
+        return True
+
+    def store_built(self, recipe, arch, started):
+        """Add the wheels this build just produced to the cache."""
+        entry = self.cache_plan.get(arch.arch, {}).get(recipe.name)
+        if entry is None or not isinstance(recipe, PyProjectRecipe):
+            return
+        tag = recipe.get_wheel_platform_tag(arch.arch)
+        pattern = os.path.join(recipe.get_build_dir(arch.arch), "dist", "*-{}.whl".format(tag))
+        # dist/ keeps wheels from earlier builds; only take this build's.
+        wheels = [w for w in glob.glob(pattern) if os.path.getmtime(w) >= started]
+        if wheels:
+            self.wheel_cache.store(arch.arch, recipe.name, entry["key"], wheels, entry["inputs"])
+
+    def build_archs_parallel(self, parsed_args, recipes):
+        """Build every arch in its own recipebuild.py process.
+
+        Sources, git checkouts included, are fetched once into
+        ``<workdir>/packages`` before the workers start. Workers get
+        --skip-downloads, so they never run p4a's download step (a git
+        fetch/pull for git sources) on the shared checkouts. Each arch then builds
+        in ``<workdir>/archs/<arch>`` (its own build and dist dirs, with
+        ``packages`` linked to the shared one) and logs to
+        ``<log_dir>/<arch>.log``. All wheels land in the same save_wheel_dir.
+        """
+        self.wait_downloads(self.prepare_recipes(recipes, parsed_args.arch))
+        packages_path = os.path.abspath(self.ctx.packages_path)
+        ensure_dir(packages_path)
+        ensure_dir(self.log_dir)
+
+        workers = {}
+        for arch in parsed_args.arch:
+            arch_dir = os.path.join(self.build_dir, "archs", arch)
+            ensure_dir(arch_dir)
+            packages_link = os.path.join(arch_dir, "packages")
+            if not os.path.lexists(packages_link):
+                os.symlink(packages_path, packages_link)
+
+            cmd = [
+                sys.executable,
+                os.path.abspath(__file__),
+                "-a", arch,
+                "-w", arch_dir,
+                "-s", os.path.abspath(parsed_args.save_wheel_dir),
+                "-m", str(parsed_args.min_api),
+                "-t", str(parsed_args.target_api),
+                "-j", str(self.jobs),
+                "--log-dir", os.path.abspath(self.log_dir),
+                "--download-cache", str(self.download_cache.root.resolve()),
+                "--skip-downloads",
+            ]
+            if self.wheel_cache is not None:
+                cmd += ["--wheel-cache", str(self.wheel_cache.root.resolve())]
+            if self.history_path:
+                cmd += ["--history", os.path.abspath(self.history_path)]
+            if self.compiler_cache is not None:
+                cmd += [
+                    "--compiler-cache", self.compiler_cache.tool,
+                    "--compiler-cache-dir", str(self.compiler_cache.root.resolve()),
+                ]
+                if self.compiler_cache.max_size:
+                    cmd += ["--compiler-cache-size", self.compiler_cache.max_size]
+            # One profile per arch: <stem>-<arch><suffix>
+            for flag, path in (("--profile", self.profile_path), ("--trace", self.trace_path)):
+                if path:
+                    path = Path(path).resolve()
+                    cmd += [flag, str(path.with_name(f"{path.stem}-{arch}{path.suffix}"))]
+            cmd += ["-r", *parsed_args.recipes]
+            log_path = os.path.join(self.log_dir, "{}.log".format(arch))
+            info_main("# Building {} in {} (log: {})".format(arch, arch_dir, log_path))
+            with open(log_path, "w") as log:
+                workers[arch] = (
+                    subprocess.Popen(cmd, stdout=log, stderr=subprocess.STDOUT),
+                    log_path,
+                )
+
+        failed = []
+        for arch, (proc, log_path) in workers.items():
+            if proc.wait() == 0:
+                info_main("Built all recipes for {}".format(arch))
+            else:
+                failed.append(arch)
+                error("Build for {} failed with exit code {} (see {})".format(
+                    arch, proc.returncode, log_path))
+
+        # Once, after every worker is done writing to the shared save_wheel_dir.
+        if self.slim:
+            self.slim_wheels()
+        self.write_profile()
+        if failed:
+            error("# Failed archs: {}".format(", ".join(failed)))
+            sys.exit(1)
+
+    def build_parallel(self, recipes):
+        """Build each recipe as soon as its dependencies are installed.
+
+        Every recipe runs prepare, prebuild and build in a forked worker, with
+        its output going to ``<log_dir>/<arch>/<recipe>.log``. hostpython3,
+        python3 and their dependencies are built in this process first: they
+        set ctx.hostpython and ctx.python_recipe, which workers only see if
+        they were set before the fork.
+        """
+        global _BUILDER
+        _BUILDER = self
+        # Forking while download threads run could copy held locks.
+        self.wait_downloads(recipes)
+        self.recipes_by_name = {recipe.name: recipe for recipe in recipes}
+        names = [recipe.name for recipe in recipes]
+        graph = {
+            recipe.name: recipe_dependencies(
+                recipe.name, recipe.depends, recipe.opt_depends, set(names)
+            )
+            for recipe in recipes
+        }
+
+        failures = {}
+        for arch in self.ctx.archs:
+            info_main(
+                "# Building all recipes for arch {} with {} jobs".format(arch.arch, self.jobs)
+            )
+            # Before forking, so workers see which recipes are cache hits.
+            self.plan_cache(recipes, arch)
+            # ... and inherit this arch's compiler cache settings.
+            self.start_compiler_cache(arch)
+
+            def on_start(name, arch=arch):
+                info("Building {} for {} (log: {})".format(
+                    name, arch.arch, self.log_path(name, arch.arch)))
+
+            def on_finish(name, status, exc, arch=arch):
+                if status == FAILED:
+                    error("{} failed for {}: {}".format(name, arch.arch, exc))
+                elif status == SKIPPED:
+                    error("{} skipped for {}: a dependency failed".format(name, arch.arch))
+                else:
+                    info_main("Built {} for {}".format(name, arch.arch))
+
+            try:
+                chain = BuildScheduler(
+                    {name: graph[name] for name in dependency_closure(graph, PYTHON_CHAIN)},
+                    names,
+                )
+                chain.run(
+                    InlineExecutor(),
+                    functools.partial(self.build_recipe_logged, arch_name=arch.arch),
+                    1,
+                    on_start,
+                    on_finish,
+                )
+                self.set_python_context(arch)
+                scheduler = BuildScheduler(graph, names, done=chain.status)
+                scheduler.errors.update(chain.errors)
+                # fork keeps the already prepared Context; p4a state is not picklable.
+                with ProcessPoolExecutor(
+                    self.jobs, mp_context=multiprocessing.get_context("fork")
+                ) as pool:
+                    status = scheduler.run(
+                        pool,
+                        functools.partial(_build_in_worker, arch_name=arch.arch),
+                        self.jobs,
+                        on_start,
+                        on_finish,
+                    )
+            finally:
+                self.finish_compiler_cache(arch)
+            for records in scheduler.results.values():
+                self.profiler.records.extend(records)
+            for name, result in status.items():
+                if result != OK:
+                    failures[(arch.arch, name)] = scheduler.errors.get(name, result)
+
+        if failures:
+            error("# {} recipe builds did not finish:".format(len(failures)))
+            for (arch_name, name), result in sorted(failures.items()):
+                error("  {} [{}]: {}".format(name, arch_name, result))
+            sys.exit(1)
+
+    def set_python_context(self, arch):
+        """Point the Context at python3 and hostpython3 as p4a's build_recipes does."""
+        Recipe.get_recipe("python3", self.ctx).prebuild_arch(arch)
+        self.ctx.hostpython = Recipe.get_recipe("hostpython3", self.ctx).python_exe
+
+    def log_path(self, name, arch_name):
+        return os.path.join(self.log_dir, arch_name, "{}.log".format(name))
+
+    def build_recipe(self, recipe, arch):
+        if self.cached_wheels(recipe, arch):
+            with self.profiler.phase("restore", recipe.name, arch.arch):
+                self.restore_cached(recipe, arch)
+            return
+        started = time.time()
+        with self.profiler.phase("unpack", recipe.name, arch.arch):
+            ensure_dir(recipe.get_build_container_dir(arch.arch))
+            recipe.prepare_build_dir(arch.arch)
+
+        info_main("Prebuilding {} for {}".format(recipe.name, arch.arch))
+        with self.profiler.phase("prebuild", recipe.name, arch.arch):
+            recipe.prebuild_arch(arch)
+            recipe.apply_patches(arch)
+
+        info_main("Building {} for {}".format(recipe.name, arch.arch))
+        with self.profiler.phase("build", recipe.name, arch.arch):
+            if recipe.should_build(arch):
+                recipe.build_arch(arch)
+            else:
+                info("{} said it is already built, skipping".format(recipe.name))
+        with self.profiler.phase("install_libraries", recipe.name, arch.arch):
+            recipe.install_libraries(arch)
+        self.store_built(recipe, arch, started)
+
+    def build_recipe_logged(self, name, arch_name):
+        """Worker entry point: build one recipe with stdout/stderr sent to its log.
+
+        Returns the profile records of this build for the parent to merge.
+        """
+        arch = next(a for a in self.ctx.archs if a.arch == arch_name)
+        # Workers are reused and inherit the parent's records; return only ours.
+        first_record = len(self.profiler.records)
+        log_path = self.log_path(name, arch_name)
+        ensure_dir(os.path.dirname(log_path))
+
+        sys.stdout.flush()
+        sys.stderr.flush()
+        saved = [os.dup(1), os.dup(2)]
+        with open(log_path, "w") as log:
+            os.dup2(log.fileno(), 1)
+            os.dup2(log.fileno(), 2)
+            try:
+                self.build_recipe(self.recipes_by_name[name], arch)
+            except BaseException as e:
+                # sh.ErrorReturnCode does not always pickle, and p4a sometimes
+                # calls exit(); hand the parent a plain error instead.
+                raise RuntimeError(
+                    "{}: {} (see {})".format(type(e).__name__, e, log_path)
+                ) from None
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                for fd, saved_fd in zip((1, 2), saved):
+                    os.dup2(saved_fd, fd)
+                    os.close(saved_fd)
+        return list(self.profiler.records[first_record:])
 
 
 if __name__ == "__main__":
@@ -121,4 +667,86 @@ if __name__ == "__main__":
     parser.add_argument(
         "-t", "--target-api", type=int, help="Android target api.", default=24
     )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Build up to N independent recipes at once (default: 1, the serial "
+        "unpack/prebuild/build order).",
+    )
+    parser.add_argument(
+        "--log-dir",
+        type=str,
+        help="Where per-recipe logs (--jobs > 1) and per-arch logs "
+        "(--parallel-archs) go (default: <workdir>/logs).",
+    )
+    parser.add_argument(
+        "--parallel-archs",
+        action="store_true",
+        help="Build each arch in its own process with separate build dirs.",
+    )
+    parser.add_argument(
+        "--wheel-cache",
+        type=str,
+        help="Directory of cached wheels keyed by recipe inputs. Hits are restored "
+        "instead of rebuilt; new builds are added.",
+    )
+    parser.add_argument(
+        "--download-jobs",
+        type=int,
+        default=4,
+        help="Number of sources to download at once (default: 4).",
+    )
+    parser.add_argument(
+        "--download-cache",
+        type=str,
+        help="Persistent source download cache shared between workdirs "
+        "(default: $XDG_CACHE_HOME/p4a-wheels/downloads).",
+    )
+    parser.add_argument(
+        "--skip-downloads",
+        action="store_true",
+        help="Build from the sources already in <workdir>/packages without fetching "
+        "or updating them (--parallel-archs passes this to its arch workers).",
+    )
+    parser.add_argument(
+        "--profile",
+        type=str,
+        help="Write per-phase wall/CPU time, bytes written and the children's RSS high-water mark for "
+        "every recipe to this file (.csv for CSV, JSON otherwise).",
+    )
+    parser.add_argument(
+        "--trace",
+        type=str,
+        help="Write the same phases as a Chrome trace-event JSON file.",
+    )
+    parser.add_argument(
+        "--history",
+        type=str,
+        help="Add the build time of every recipe built in this run to this JSON "
+        "history (read by ci_plan.py).",
+    )
+    parser.add_argument(
+        "--slim",
+        action="store_true",
+        help="Run slim_wheels.py over the wheels built in this run (strip with the "
+        "NDK's llvm-strip, drop tests/__pycache__, recompress).",
+    )
+    parser.add_argument(
+        "--compiler-cache",
+        choices=COMPILER_CACHE_TOOLS,
+        help="Wrap the NDK compilers (and rustc, for sccache) with a compiler cache.",
+    )
+    parser.add_argument(
+        "--compiler-cache-dir",
+        type=str,
+        help="Root of the compiler caches, one subdir per arch and min api "
+        "(default: $XDG_CACHE_HOME/p4a-wheels/compiler).",
+    )
+    parser.add_argument(
+        "--compiler-cache-size",
+        type=str,
+        help="Maximum size of each compiler cache dir, e.g. 5G.",
+    )
     RecipeBuilder(parser.parse_args())
@@ -1,10 +1,38 @@
 import argparse
-import hashlib
+import http.client
 import json
+import os
+import random
+import re
 import subprocess
 import sys
 import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
+from urllib.parse import quote, urlsplit
+
+import wheel_hashes
+from wheel_hashes import sha256_file
+
+
+# gh reports secondary rate limits and transient server errors on stderr;
+# these are retried with exponential backoff instead of failing the asset.
+RETRY_MARKERS = (
+    "rate limit",
+    "abuse detection",
+    "http 429",
+    "http 500",
+    "http 502",
+    "http 503",
+    "http 504",
+    "connection reset",
+    "timeout",
+)
+MAX_BACKOFF = 120.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+UPLOAD_BLOCK_SIZE = 1024 * 1024
 
 
 def run(cmd: list[str]) -> str:
@@ -41,15 +69,246 @@ def run_json(cmd: list[str]):
     return json.loads(output)
 
 
-def sha256_file(path: Path) -> str:
-    hasher = hashlib.sha256()
-    with path.open("rb") as f:
-        for chunk in iter(lambda: f.read(1024 * 1024), b""):
-            hasher.update(chunk)
-    return hasher.hexdigest()
+def run_with_retry(cmd: list[str], retries: int, backoff: float) -> str:
+    """Run ``cmd``, backing off exponentially on rate limits and 5xx errors."""
+    for attempt in range(retries + 1):
+        try:
+            return run(cmd)
+        except subprocess.CalledProcessError as e:
+            stderr = (e.stderr or "").lower()
+            if attempt == retries or not any(marker in stderr for marker in RETRY_MARKERS):
+                raise
+            # Full jitter keeps parallel workers from retrying in lockstep.
+            time.sleep(random.uniform(0, min(MAX_BACKOFF, backoff * 2**attempt)))
+    raise AssertionError("unreachable")
+
+
+def error_summary(e: Exception) -> str:
+    if isinstance(e, subprocess.CalledProcessError) and e.stderr:
+        return e.stderr.strip().splitlines()[-1]
+    return str(e) or type(e).__name__
+
+
+def run_parallel(label: str, names: list[str], action, jobs: int) -> dict[str, str]:
+    """Apply ``action`` to every name on ``jobs`` threads; return failures."""
+    failed = {}
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        futures = {pool.submit(action, name): name for name in names}
+        for i, future in enumerate(as_completed(futures), start=1):
+            name = futures[future]
+            progress(label, i, len(names), name)
+            try:
+                future.result()
+            except Exception as e:
+                failed[name] = error_summary(e)
+    return failed
+
+
+def is_wheel_asset(name: str) -> bool:
+    return name.endswith(".whl") or name.endswith(".whl.metadata")
+
+
+class GhBackend:
+    """Release operations through the gh CLI, one process per call."""
+
+    def __init__(self, tag: str, gh: str = "gh", retries: int = 5, backoff: float = 2.0):
+        self.tag = tag
+        self.gh = gh
+        self.retries = retries
+        self.backoff = backoff
+
+    def list_assets(self) -> dict[str, dict]:
+        repo = run(
+            [self.gh, "repo", "view", "--json", "nameWithOwner", "--jq", ".nameWithOwner"]
+        )
+        release = run_json([self.gh, "api", f"repos/{repo}/releases/tags/{self.tag}"])
+        if not release:
+            return {}
+        # The release object only embeds the first page of assets.
+        output = run(
+            [
+                self.gh,
+                "api",
+                "--paginate",
+                f"repos/{repo}/releases/{release['id']}/assets?per_page=100",
+                "--jq",
+                ".[] | @json",
+            ]
+        )
+        assets = [json.loads(line) for line in output.splitlines() if line.strip()]
+        return {asset["name"]: asset for asset in assets}
+
+    def delete_asset(self, name: str) -> None:
+        try:
+            run_with_retry(
+                [self.gh, "release", "delete-asset", self.tag, name, "-y"],
+                self.retries,
+                self.backoff,
+            )
+        except subprocess.CalledProcessError as e:
+            # Already gone, e.g. deleted by an earlier interrupted run.
+            if "not found" not in (e.stderr or "").lower():
+                raise
+
+    def upload_asset(self, path: Path) -> None:
+        # --clobber replaces a half-uploaded asset left behind by a failed run.
+        run_with_retry(
+            [self.gh, "release", "upload", self.tag, str(path), "--clobber"],
+            self.retries,
+            self.backoff,
+        )
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, reason: str, body: bytes):
+        try:
+            message = json.loads(body).get("message", "")
+        except (ValueError, AttributeError):
+            message = body[:200].decode("utf-8", "replace")
+        super().__init__(f"HTTP {status} {reason}: {message}".rstrip(": "))
+        self.status = status
+        self.message = message
+
+
+class HttpBackend:
+    """Release operations over the GitHub REST API.
+
+    Each worker thread keeps one keep-alive connection per host, so the TLS
+    handshake and auth lookup happen once per thread rather than once per
+    asset. Uploads are streamed from disk in UPLOAD_BLOCK_SIZE blocks.
+    """
+
+    def __init__(
+        self,
+        repo: str,
+        tag: str,
+        token: str,
+        api_url: str = "https://api.github.com",
+        retries: int = 5,
+        backoff: float = 2.0,
+    ):
+        self.repo = repo
+        self.tag = tag
+        self.token = token
+        self.api_url = api_url.rstrip("/")
+        self.retries = retries
+        self.backoff = backoff
+        self.local = threading.local()
+        self.release = None
+        self.asset_ids: dict[str, int] = {}
+
+    def connection(self, scheme: str, netloc: str) -> http.client.HTTPConnection:
+        pool = self.local.__dict__.setdefault("connections", {})
+        conn = pool.get((scheme, netloc))
+        if conn is None:
+            cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+            conn = cls(netloc, timeout=300, blocksize=UPLOAD_BLOCK_SIZE)
+            pool[scheme, netloc] = conn
+        return conn
+
+    def request(self, method: str, url: str, path: Path | None = None, ok=(200,)):
+        """Send one request, retrying rate limits, 5xx and dropped connections."""
+        parts = urlsplit(url if "://" in url else self.api_url + url)
+        target = parts.path + (f"?{parts.query}" if parts.query else "")
+        headers = {
+            "Accept": "application/vnd.github+json",
+            "Authorization": f"Bearer {self.token}",
+            "X-GitHub-Api-Version": "2022-11-28",
+            "User-Agent": "p4a-wheels-release",
+        }
+        for attempt in range(self.retries + 1):
+            conn = self.connection(parts.scheme, parts.netloc)
+            delay = random.uniform(0, min(MAX_BACKOFF, self.backoff * 2**attempt))
+            try:
+                if path is not None:
+                    headers["Content-Type"] = "application/octet-stream"
+                    headers["Content-Length"] = str(path.stat().st_size)
+                    with path.open("rb") as body:
+                        conn.request(method, target, body=body, headers=headers)
+                        response = conn.getresponse()
+                else:
+                    conn.request(method, target, headers=headers)
+                    response = conn.getresponse()
+                data = response.read()
+            except (http.client.HTTPException, ConnectionError, TimeoutError):
+                conn.close()
+                if attempt == self.retries:
+                    raise
+                time.sleep(delay)
+                continue
+
+            if response.status in ok:
+                return response, data
+            error = HttpError(response.status, response.reason, data)
+            rate_limited = response.status == 403 and (
+                response.getheader("x-ratelimit-remaining") == "0"
+                or "rate limit" in error.message.lower()
+            )
+            if attempt == self.retries or not (rate_limited or response.status in RETRY_STATUSES):
+                raise error
+            retry_after = response.getheader("retry-after")
+            if retry_after and retry_after.isdigit():
+                delay = min(MAX_BACKOFF, float(retry_after))
+            time.sleep(delay)
+        raise AssertionError("unreachable")
+
+    def list_assets(self) -> dict[str, dict]:
+        try:
+            _, data = self.request("GET", f"/repos/{self.repo}/releases/tags/{quote(self.tag)}")
+        except HttpError as e:
+            if e.status == 404:
+                raise SystemExit(f"Release {self.tag} not found in {self.repo}") from e
+            raise
+        self.release = json.loads(data)
+        assets = []
+        url = f"/repos/{self.repo}/releases/{self.release['id']}/assets?per_page=100"
+        while url:
+            response, data = self.request("GET", url)
+            assets.extend(json.loads(data))
+            match = re.search(r'<([^>]+)>;\s*rel="next"', response.getheader("link") or "")
+            url = match.group(1) if match else None
+        self.asset_ids = {asset["name"]: asset["id"] for asset in assets}
+        return {asset["name"]: asset for asset in assets}
+
+    def delete_asset(self, name: str) -> None:
+        asset_id = self.asset_ids.get(name)
+        if asset_id is None:
+            return
+        self.request("DELETE", f"/repos/{self.repo}/releases/assets/{asset_id}", ok=(204, 404))
 
+    def upload_asset(self, path: Path) -> None:
+        upload_url = self.release["upload_url"].split("{", 1)[0]
+        url = f"{upload_url}?name={quote(path.name)}"
+        try:
+            self.request("POST", url, path=path, ok=(201,))
+        except HttpError as e:
+            if e.status != 422:
+                raise
+            # A half-finished upload from an earlier run still holds the
+            # name; drop it and upload once more.
+            self.list_assets()
+            self.delete_asset(path.name)
+            self.request("POST", url, path=path, ok=(201,))
 
-def main(tag: str, wheel_dir: Path, dry_run: bool):
+
+def github_token(gh: str) -> str:
+    token = os.environ.get("GH_TOKEN") or os.environ.get("GITHUB_TOKEN")
+    if token:
+        return token
+    try:
+        return run([gh, "auth", "token"])
+    except (OSError, subprocess.CalledProcessError) as e:
+        raise SystemExit("No GitHub token: set GH_TOKEN/GITHUB_TOKEN or run 'gh auth login'") from e
+
+
+def main(
+    tag: str,
+    wheel_dir: Path,
+    dry_run: bool,
+    jobs: int = 1,
+    backend=None,
+    verify: bool = False,
+):
     if not wheel_dir.exists() or not wheel_dir.is_dir():
         raise SystemExit(f"Invalid directory: {wheel_dir}")
 
@@ -59,17 +318,11 @@ def main(tag: str, wheel_dir: Path, dry_run: bool):
         print("No .whl or .whl.metadata files found. Nothing to do.")
         return
 
-    repo = run(
-        ["gh", "repo", "view", "--json", "nameWithOwner", "--jq", ".nameWithOwner"]
-    )
+    backend = backend or GhBackend(tag)
 
     # Get existing assets and URLs.
-    release = run_json(["gh", "api", f"repos/{repo}/releases/tags/{tag}"])
-    assets = release.get("assets", []) if release else []
     existing_assets = {
-        asset["name"]: asset
-        for asset in assets
-        if asset["name"].endswith(".whl") or asset["name"].endswith(".whl.metadata")
+        name: asset for name, asset in backend.list_assets().items() if is_wheel_asset(name)
     }
 
     # Delete all existing wheel assets: removes stale wheels and avoids upload conflicts.
@@ -82,9 +335,21 @@ def main(tag: str, wheel_dir: Path, dry_run: bool):
 
     overlap = sorted(name for name in local_assets if name in existing_assets)
     if overlap:
+        # Reuse digests recorded by gen_pip_index.py or an earlier release
+        # run for files whose size and mtime are unchanged.
+        known_hashes = wheel_hashes.load(wheel_dir)
+        reused = 0
         for i, name in enumerate(overlap, start=1):
             progress("Checking", i, len(overlap), name)
-            local_hash = sha256_file(local_assets[name])
+            path = local_assets[name]
+            local_hash = None if verify else wheel_hashes.lookup(known_hashes, path)
+            if local_hash is None:
+                # stat before hashing so a file modified meanwhile is rehashed next time.
+                st = path.stat()
+                local_hash = sha256_file(path)
+                wheel_hashes.record(known_hashes, path, local_hash, st)
+            else:
+                reused += 1
             # Attempt to use the 'digest' field from the release API response.
             # Fall back to empty string if not present.
             # Digest is returned as "sha256:..."
@@ -94,6 +359,8 @@ def main(tag: str, wheel_dir: Path, dry_run: bool):
                 print(f"Mismatch: {name}")
                 to_delete.append(name)
                 to_upload.append(name)
+        wheel_hashes.save(wheel_dir, known_hashes)
+        print(f"Reused {reused}/{len(overlap)} digests from {wheel_hashes.HASHES_NAME}")
     missing_remote = sorted(
         name for name in local_assets if name not in existing_assets
     )
@@ -102,24 +369,47 @@ def main(tag: str, wheel_dir: Path, dry_run: bool):
     stale_remote = sorted(name for name in existing_assets if name not in local_assets)
     to_delete.extend(stale_remote)
 
+    def delete(name: str) -> None:
+        if not dry_run:
+            backend.delete_asset(name)
+
+    def upload(name: str) -> None:
+        if not dry_run:
+            backend.upload_asset(wheel_dir / name)
+
+    started = time.monotonic()
+    to_delete = sorted(set(to_delete))
+    failed_deletes: dict[str, str] = {}
     if to_delete:
-        for i, name in enumerate(sorted(set(to_delete)), start=1):
-            progress("Deleting", i, len(set(to_delete)), name)
-            if not dry_run:
-                run(["gh", "release", "delete-asset", tag, name, "-y"])
+        failed_deletes = run_parallel("Deleting", to_delete, delete, jobs)
     else:
         print("No existing wheel/metadata assets to delete.")
 
-    # Upload all wheels
-    to_upload = sorted(set(to_upload))
+    # Upload all wheels, except ones whose old copy could not be removed.
+    to_upload = sorted(set(to_upload) - set(failed_deletes))
+    failed_uploads: dict[str, str] = {}
     if to_upload:
-        for i, name in enumerate(to_upload, start=1):
-            progress("Uploading", i, len(to_upload), name)
-            if not dry_run:
-                run(["gh", "release", "upload", tag, str(wheel_dir / name)])
+        failed_uploads = run_parallel("Uploading", to_upload, upload, jobs)
     else:
         print("No wheel/metadata assets to upload.")
 
+    elapsed = time.monotonic() - started
+    uploaded = [name for name in to_upload if name not in failed_uploads]
+    uploaded_bytes = sum(local_assets[name].stat().st_size for name in uploaded)
+    rate = uploaded_bytes / elapsed / 1e6 if elapsed else 0.0
+    print(
+        f"Deleted {len(to_delete) - len(failed_deletes)}/{len(to_delete)}, "
+        f"uploaded {len(uploaded)}/{len(to_upload)} assets "
+        f"({uploaded_bytes / 1e6:.1f} MB in {elapsed:.1f}s, {rate:.2f} MB/s, jobs={jobs})"
+    )
+    failures = [("delete", n, e) for n, e in failed_deletes.items()]
+    failures += [("upload", n, e) for n, e in failed_uploads.items()]
+    if failures:
+        print(f"{len(failures)} asset(s) failed; rerun to resume:")
+        for action, name, error in sorted(failures, key=lambda f: f[1]):
+            print(f"  {action} {name}: {error}")
+        raise SystemExit(1)
+
     print("Done.")
 
 
@@ -134,6 +424,54 @@ if __name__ == "__main__":
         action="store_true",
         help="Print actions without deleting or uploading assets",
     )
+    parser.add_argument(
+        "--verify",
+        action="store_true",
+        help=f"Rehash every local file instead of trusting {wheel_hashes.HASHES_NAME}",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Delete and upload up to N assets concurrently (default: 1)",
+    )
+    parser.add_argument(
+        "--retries",
+        type=int,
+        default=5,
+        help="Retries per asset on rate limits or server errors (default: 5)",
+    )
+    parser.add_argument(
+        "--gh",
+        default=os.environ.get("GH", "gh"),
+        help="gh executable to call (default: $GH or 'gh')",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=("gh", "http"),
+        default="gh",
+        help="'gh' runs one gh process per call; 'http' talks to the REST API "
+        "over pooled keep-alive connections (default: gh)",
+    )
+    parser.add_argument(
+        "--repo",
+        default=os.environ.get("GITHUB_REPOSITORY"),
+        help="owner/name for --backend http (default: $GITHUB_REPOSITORY or gh repo view)",
+    )
+    parser.add_argument(
+        "--api-url",
+        default=os.environ.get("GITHUB_API_URL", "https://api.github.com"),
+        help="REST API root for --backend http (default: $GITHUB_API_URL or api.github.com)",
+    )
     args = parser.parse_args()
 
-    main(args.tag, Path(args.wheel_dir), args.dry_run)
+    if args.backend == "http":
+        repo = args.repo or run(
+            [args.gh, "repo", "view", "--json", "nameWithOwner", "--jq", ".nameWithOwner"]
+        )
+        backend = HttpBackend(repo, args.tag, github_token(args.gh), args.api_url, args.retries)
+    else:
+        backend = GhBackend(args.tag, args.gh, args.retries)
+
+    main(args.tag, Path(args.wheel_dir), args.dry_run, args.jobs, backend, args.verify)
@@ -4,7 +4,7 @@ set -e
 
 export PATH=$PATH:~/.local/bin/
 sudo apt update
-sudo apt install -y git zip unzip openjdk-17-jdk python3-pip python3-virtualenv autoconf libtool pkg-config zlib1g-dev libncurses5-dev libncursesw5-dev libtinfo6 cmake libffi-dev libssl-dev automake autopoint gettext libltdl-dev po4a
+sudo apt install -y git zip unzip openjdk-17-jdk python3-pip python3-virtualenv autoconf libtool pkg-config zlib1g-dev libncurses5-dev libncursesw5-dev libtinfo6 cmake libffi-dev libssl-dev automake autopoint gettext libltdl-dev po4a ccache
 
 # remove fortran compiler
 sudo rm -rf /usr/bin/f95
@@ -44,4 +44,20 @@ mkdir -p p4aworkdir/output
 WORKDIR=$(realpath p4aworkdir)
 # --- build ---
 ARCH=${1:-arm64-v8a}
-P4A_WHEEL_DIR="$WORKDIR/output" TERM=xterm-256color python3 recipebuild.py -a "$ARCH" -r $RECIPES -w "$WORKDIR"
+# optional sharding: run_on_ci.sh <arch> <shard> <shards>
+SHARD=${2:-}
+SHARDS=${3:-1}
+# keep this file between runs (e.g. actions/cache) so shards follow real build times
+HISTORY="$WORKDIR/build-history.json"
+if [ -n "$SHARD" ]; then
+    RECIPE_ARGS=$(python3 ci_plan.py --shards "$SHARDS" --shard "$SHARD" --arch "$ARCH" --history "$HISTORY" -r $RECIPES)
+else
+    RECIPE_ARGS="-r $RECIPES"
+fi
+if [ -z "$RECIPE_ARGS" ]; then
+    echo "Shard $SHARD of $SHARDS has no recipes, nothing to build."
+    exit 0
+fi
+echo "Building: $RECIPE_ARGS"
+P4A_WHEEL_DIR="$WORKDIR/output" TERM=xterm-256color python3 recipebuild.py -a "$ARCH" $RECIPE_ARGS -w "$WORKDIR" --history "$HISTORY" \
+    --compiler-cache ccache --compiler-cache-dir "$HOME/.cache/p4a-wheels/compiler"
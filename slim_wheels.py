@@ -0,0 +1,203 @@
+"""Rewrite built wheels smaller: strip native libraries, drop dead payload,
+recompress, and regenerate RECORD.
+
+example:
+  python3 slim_wheels.py ~/wheels --drop-tests --level 9
+"""
+
+import argparse
+import base64
+import csv
+import fnmatch
+import glob
+import hashlib
+import io
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Useless on device; .dist-info entries are never excluded.
+DEFAULT_EXCLUDES = (
+    "*/__pycache__/*",
+    "*.pyc",
+    "*.pyo",
+    "*.h",
+)
+# Opt-in (--drop-tests): some packages import their test/ subpackage at runtime.
+TEST_EXCLUDES = (
+    "*/tests/*",
+    "*/test/*",
+)
+ELF_MAGIC = b"\x7fELF"
+# Signatures cover the old RECORD and would no longer verify.
+DROPPED_METADATA = ("RECORD.jws", "RECORD.p7s")
+
+
+def find_llvm_strip(ndk_dir: str | None = None) -> str | None:
+    """llvm-strip from the NDK (``$NDK_DIR`` by default), else from PATH."""
+    ndk_dir = ndk_dir or os.environ.get("NDK_DIR")
+    if ndk_dir:
+        matches = sorted(glob.glob(os.path.join(ndk_dir, "toolchains", "llvm", "prebuilt", "*", "bin", "llvm-strip")))
+        if matches:
+            return matches[0]
+    return shutil.which("llvm-strip")
+
+
+def record_hash(data: bytes) -> str:
+    digest = hashlib.sha256(data).digest()
+    return "sha256=" + base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+
+def is_excluded(name: str, excludes) -> bool:
+    top = name.split("/", 1)[0]
+    if top.endswith(".dist-info"):
+        return False
+    return any(fnmatch.fnmatch(name, pattern) for pattern in excludes)
+
+
+def strip_library(data: bytes, llvm_strip: str, tmp_dir: str) -> bytes:
+    """Run llvm-strip --strip-unneeded on an in-memory ELF; the original on failure."""
+    fd, path = tempfile.mkstemp(suffix=".so", dir=tmp_dir)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        result = subprocess.run([llvm_strip, "--strip-unneeded", path], capture_output=True, text=True)
+        if result.returncode != 0:
+            print(f"[WARN] llvm-strip failed: {result.stderr.strip()}", file=sys.stderr)
+            return data
+        with open(path, "rb") as f:
+            return f.read()
+    finally:
+        os.unlink(path)
+
+
+def slim_wheel(whl: Path, llvm_strip: str | None, excludes, level: int) -> tuple[int, int, int, int]:
+    """Rewrite ``whl`` in place. Returns (old size, new size, dropped files, stripped libs)."""
+    old_size = whl.stat().st_size
+    dropped = stripped = 0
+    records = []
+    tmp_whl = whl.with_name(f".{whl.name}.slim")
+    with zipfile.ZipFile(whl) as src, tempfile.TemporaryDirectory() as tmp_dir:
+        dist_info = next(
+            (n.split("/", 1)[0] for n in src.namelist() if n.split("/", 1)[0].endswith(".dist-info")),
+            None,
+        )
+        if dist_info is None:
+            raise ValueError(f"{whl.name}: no .dist-info directory")
+        record_name = f"{dist_info}/RECORD"
+        try:
+            with zipfile.ZipFile(tmp_whl, "w", zipfile.ZIP_DEFLATED, compresslevel=level) as dst:
+                for info in src.infolist():
+                    name = info.filename
+                    if name == record_name or name in (f"{dist_info}/{m}" for m in DROPPED_METADATA):
+                        continue
+                    if info.is_dir():
+                        continue
+                    if is_excluded(name, excludes):
+                        dropped += 1
+                        continue
+                    data = src.read(info)
+                    if llvm_strip and data[:4] == ELF_MAGIC:
+                        slimmer = strip_library(data, llvm_strip, tmp_dir)
+                        stripped += len(slimmer) < len(data)
+                        data = slimmer
+                    out = zipfile.ZipInfo(name, info.date_time)
+                    out.external_attr = info.external_attr
+                    out.compress_type = zipfile.ZIP_DEFLATED
+                    dst.writestr(out, data, compresslevel=level)
+                    records.append((name, record_hash(data), len(data)))
+                records.append((record_name, "", ""))
+                try:
+                    date_time = src.getinfo(record_name).date_time
+                except KeyError:
+                    date_time = (1980, 1, 1, 0, 0, 0)
+                out = zipfile.ZipInfo(record_name, date_time)
+                out.external_attr = 0o644 << 16
+                # csv quotes names with commas or quotes, as RECORD readers expect.
+                record = io.StringIO()
+                csv.writer(record, lineterminator="\n").writerows(records)
+                dst.writestr(out, record.getvalue(), zipfile.ZIP_DEFLATED, level)
+        except BaseException:
+            tmp_whl.unlink(missing_ok=True)
+            raise
+    os.replace(tmp_whl, whl)
+    return old_size, whl.stat().st_size, dropped, stripped
+
+
+def slim_wheels(wheels, llvm_strip: str | None, excludes, level: int, jobs: int = 1) -> int:
+    """Slim every wheel, print per-wheel and total size deltas; returns bytes saved."""
+    wheels = sorted(Path(w) for w in wheels)
+    if not wheels:
+        print("No wheels to slim")
+        return 0
+    with ThreadPoolExecutor(max(jobs, 1)) as pool:
+        results = list(pool.map(lambda w: slim_wheel(w, llvm_strip, excludes, level), wheels))
+
+    total_old = total_new = 0
+    for whl, (old, new, dropped, stripped) in zip(wheels, results):
+        total_old += old
+        total_new += new
+        print(
+            f"{whl.name}: {old / 1e6:.2f} MB -> {new / 1e6:.2f} MB "
+            f"({(new - old) / old:+.1%}), {stripped} libs stripped, {dropped} files dropped"
+        )
+    saved = total_old - total_new
+    print(
+        f"Total: {total_old / 1e6:.2f} MB -> {total_new / 1e6:.2f} MB, "
+        f"saved {saved / 1e6:.2f} MB ({-saved / total_old:+.1%}) over {len(wheels)} wheels"
+    )
+    return saved
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Strip, prune and recompress wheels in place.")
+    parser.add_argument("wheels", nargs="+", help="Wheel files or directories of wheels.")
+    parser.add_argument(
+        "--llvm-strip",
+        help="llvm-strip binary (default: from $NDK_DIR, then PATH).",
+    )
+    parser.add_argument("--no-strip", action="store_true", help="Do not strip native libraries.")
+    parser.add_argument(
+        "--exclude",
+        action="append",
+        default=[],
+        metavar="GLOB",
+        help="Drop members matching GLOB (repeatable; '*' also matches '/').",
+    )
+    parser.add_argument(
+        "--no-default-excludes",
+        action="store_true",
+        help=f"Do not drop {', '.join(DEFAULT_EXCLUDES)}.",
+    )
+    parser.add_argument(
+        "--drop-tests",
+        action="store_true",
+        help=f"Also drop {', '.join(TEST_EXCLUDES)}; check that the packages do not import them.",
+    )
+    parser.add_argument("--level", type=int, default=9, choices=range(10), help="Deflate level (default: 9).")
+    parser.add_argument("-j", "--jobs", type=int, default=0, help="Wheels to process at once (default: CPU count).")
+    args = parser.parse_args()
+
+    wheels = []
+    for path in map(Path, args.wheels):
+        wheels.extend(sorted(path.glob("*.whl")) if path.is_dir() else [path])
+
+    llvm_strip = None
+    if not args.no_strip:
+        llvm_strip = args.llvm_strip or find_llvm_strip()
+        if not llvm_strip:
+            print("[WARN] llvm-strip not found; set NDK_DIR or pass --llvm-strip. Not stripping.", file=sys.stderr)
+
+    excludes = list(args.exclude) + ([] if args.no_default_excludes else list(DEFAULT_EXCLUDES))
+    if args.drop_tests:
+        excludes += TEST_EXCLUDES
+    slim_wheels(wheels, llvm_strip, excludes, args.level, args.jobs or os.cpu_count() or 1)
+
+
+if __name__ == "__main__":
+    main()
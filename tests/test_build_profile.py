@@ -0,0 +1,62 @@
+import json
+import resource
+import subprocess
+import sys
+import threading
+
+from build_profile import NullProfiler, PhaseProfiler
+
+
+def test_overlapping_phases_are_not_exclusive(tmp_path):
+    profiler = PhaseProfiler()
+    started = threading.Event()
+    release = threading.Event()
+
+    def download():
+        with profiler.phase("download", "numpy"):
+            started.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=download)
+    thread.start()
+    started.wait(5)
+    with profiler.phase("unpack", "regex", "x86"):
+        pass
+    release.set()
+    thread.join()
+    with profiler.phase("build", "regex", "x86"):
+        pass
+
+    by_phase = {r["phase"]: r for r in profiler.records}
+    assert not by_phase["download"]["exclusive"]
+    assert not by_phase["unpack"]["exclusive"]
+    assert by_phase["build"]["exclusive"]
+    assert by_phase["download"]["tid"] == thread.native_id
+    assert by_phase["unpack"]["tid"] == threading.get_native_id()
+
+    trace = tmp_path / "trace.json"
+    profiler.write_trace(trace)
+    lanes = {e["name"]: e["tid"] for e in json.loads(trace.read_text())["traceEvents"]}
+    assert lanes["numpy download"] != lanes["regex unpack"]
+
+
+def test_child_rss_is_only_reported_for_a_new_peak():
+    profiler = PhaseProfiler()
+    # larger than any child an earlier test may have reaped
+    kb = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss + 64 * 1024
+    with profiler.phase("build", "big"):
+        subprocess.run([sys.executable, "-c", f"b = bytearray({kb} * 1024)"], check=True)
+    with profiler.phase("build", "small"):
+        subprocess.run(["true"], check=True)
+    big, small = profiler.records
+    assert big["children_maxrss_kb"] >= kb
+    assert small["children_maxrss_kb"] is None
+    assert small["children_maxrss_hwm_kb"] == big["children_maxrss_hwm_kb"]
+
+
+def test_null_profilers_do_not_share_records():
+    a, b = NullProfiler(), NullProfiler()
+    with a.phase("build", "x"):
+        pass
+    a.records.append({})
+    assert b.records == []
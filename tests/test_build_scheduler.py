@@ -0,0 +1,112 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from build_scheduler import (
+    FAILED,
+    OK,
+    SKIPPED,
+    BuildScheduler,
+    InlineExecutor,
+    dependency_closure,
+    recipe_dependencies,
+)
+
+
+class StubRecipe:
+    """Records how many builds overlap; fails if listed in ``failing``."""
+
+    def __init__(self, failing=(), duration=0.02):
+        self.failing = set(failing)
+        self.duration = duration
+        self.lock = threading.Lock()
+        self.running = 0
+        self.max_running = 0
+        self.started = []
+
+    def build(self, name):
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+            self.started.append(name)
+        try:
+            time.sleep(self.duration)
+            if name in self.failing:
+                raise RuntimeError(f"{name} failed")
+            return name.upper()
+        finally:
+            with self.lock:
+                self.running -= 1
+
+
+def run(graph, jobs, order=None, done=None, stub=None):
+    stub = stub or StubRecipe()
+    scheduler = BuildScheduler(graph, order, done)
+    with ThreadPoolExecutor(8) as pool:
+        status = scheduler.run(pool, stub.build, jobs)
+    return scheduler, status, stub
+
+
+def test_runs_at_most_jobs_at_once():
+    graph = {f"leaf{i}": set() for i in range(8)}
+    _, status, stub = run(graph, jobs=3)
+    assert set(status.values()) == {OK}
+    assert stub.max_running == 3
+
+
+def test_dependencies_finish_first():
+    graph = {"python3": {"hostpython3"}, "hostpython3": set(), "numpy": {"python3"}, "regex": set()}
+    scheduler, status, stub = run(graph, jobs=4, order=["hostpython3", "python3", "numpy", "regex"])
+    assert set(status.values()) == {OK}
+    assert stub.started.index("hostpython3") < stub.started.index("python3") < stub.started.index("numpy")
+    assert scheduler.results["numpy"] == "NUMPY"
+
+
+def test_failure_skips_only_dependents():
+    graph = {"a": set(), "b": {"a"}, "c": {"b"}, "d": set()}
+    scheduler, status, _ = run(graph, jobs=2, stub=StubRecipe(failing={"a"}))
+    assert status == {"a": FAILED, "b": SKIPPED, "c": SKIPPED, "d": OK}
+    assert str(scheduler.errors["a"]) == "a failed"
+
+
+def test_cycle_is_reported():
+    graph = {"a": {"b"}, "b": {"a"}, "c": set()}
+    with pytest.raises(ValueError, match="dependency cycle"):
+        run(graph, jobs=2)
+
+
+def test_unknown_dependency_is_rejected():
+    with pytest.raises(ValueError, match="unknown dependencies: missing"):
+        BuildScheduler({"a": {"missing"}})
+
+
+def test_done_nodes_gate_but_do_not_run():
+    graph = {"python3": set(), "numpy": {"python3"}, "regex": set()}
+    _, status, stub = run(graph, jobs=2, done={"python3": OK})
+    assert status == {"python3": OK, "numpy": OK, "regex": OK}
+    assert "python3" not in stub.started
+
+    _, status, stub = run(graph, jobs=2, done={"python3": FAILED})
+    assert status == {"python3": FAILED, "numpy": SKIPPED, "regex": OK}
+    assert stub.started == ["regex"]
+
+
+def test_inline_executor_builds_chain_in_order():
+    graph = {"hostpython3": set(), "libffi": set(), "python3": {"hostpython3", "libffi"}, "numpy": {"python3"}}
+    chain = dependency_closure(graph, ("hostpython3", "python3"))
+    assert chain == {"hostpython3", "libffi", "python3"}
+    stub = StubRecipe(duration=0)
+    scheduler = BuildScheduler({name: graph[name] for name in chain}, list(graph))
+    assert scheduler.run(InlineExecutor(), stub.build, 1) == dict.fromkeys(chain, OK)
+    assert stub.started == ["hostpython3", "libffi", "python3"]
+
+
+def test_recipe_dependencies_counts_built_alternatives():
+    depends = ["python3", ("sdl2", "sdl3"), "numpy"]
+    assert recipe_dependencies("pkg", depends, ["openssl"], {"python3", "sdl3", "pkg", "openssl"}) == {
+        "python3",
+        "sdl3",
+        "openssl",
+    }
@@ -0,0 +1,105 @@
+import random
+import statistics
+
+import build_history
+from ci_plan import plan
+
+
+def catalog(deps: dict[str, list[str]]) -> dict:
+    def closure(name, seen=None):
+        seen = set() if seen is None else seen
+        for dep in deps.get(name, []):
+            if dep not in seen:
+                seen.add(dep)
+                closure(dep, seen)
+        return seen
+
+    return {"recipes": {name: {"base": "PyProjectRecipe", "closure": sorted(closure(name))} for name in deps}}
+
+
+def simulate_history(path, durations: dict[str, float], runs: int = 4, seed: int = 0):
+    """Record ``runs`` noisy runs of every recipe on two archs, like recipebuild.py --history."""
+    rng = random.Random(seed)
+    for _ in range(runs):
+        samples = []
+        for name, seconds in durations.items():
+            samples.append((name, "arm64-v8a", seconds * rng.uniform(0.9, 1.1)))
+            samples.append((name, "x86_64", seconds * 0.5))
+        build_history.update(path, samples)
+    return build_history.costs(build_history.load(path))
+
+
+def test_shards_are_balanced_by_history(tmp_path):
+    rng = random.Random(1)
+    durations = {f"leaf{i:02d}": rng.uniform(30, 900) for i in range(40)}
+    costs = simulate_history(tmp_path / "history.json", durations)
+    for name, seconds in costs.items():
+        # median of the slowest arch, not of every sample
+        assert 0.9 * durations[name] <= seconds <= 1.1 * durations[name]
+
+    shards = plan(catalog(dict.fromkeys(durations, [])), sorted(durations), 4, costs)
+
+    assert sorted(name for shard in shards for name in shard["recipes"]) == sorted(durations)
+    for shard in shards:
+        assert shard["cost"] == sum(costs[name] for name in shard["build"])
+    slowest = max(shard["cost"] for shard in shards)
+    fastest = min(shard["cost"] for shard in shards)
+    lower_bound = max(sum(costs.values()) / 4, max(costs.values()))
+    # longest-first greedy is within 4/3 of the optimum for independent jobs
+    assert slowest <= lower_bound * 4 / 3
+    assert slowest - fastest <= max(costs.values())
+
+
+def test_slow_recipe_gets_a_shard_of_its_own(tmp_path):
+    durations = {"scipy": 3000, **{f"small{i}": 100 for i in range(10)}}
+    costs = simulate_history(tmp_path / "history.json", durations, runs=1)
+    shards = plan(catalog(dict.fromkeys(durations, [])), sorted(durations), 3, costs)
+    (scipy_shard,) = [shard for shard in shards if "scipy" in shard["recipes"]]
+    assert scipy_shard["recipes"] == ["scipy"]
+    others = sorted(shard["cost"] for shard in shards if shard is not scipy_shard)
+    assert others[-1] - others[0] <= 100 * 1.1
+
+
+def test_dependencies_and_pins_follow_every_shard(tmp_path):
+    deps = {
+        "numpy": [],
+        "pandas": ["numpy"],
+        "scipy": ["numpy"],
+        "matplotlib": ["numpy", "kiwisolver"],
+        "kiwisolver": [],
+        "regex": [],
+        "pynacl": [],
+    }
+    durations = {"numpy": 600, "pandas": 900, "scipy": 1500, "matplotlib": 500, "kiwisolver": 120, "regex": 60, "pynacl": 90}
+    costs = simulate_history(tmp_path / "history.json", durations)
+    requested = ["numpy==1.26.4", "pandas", "scipy", "matplotlib", "regex", "pynacl"]
+
+    shards = plan(catalog(deps), requested, 3, costs)
+
+    assert sorted(name for shard in shards for name in shard["recipes"]) == sorted(
+        name.split("==")[0] for name in requested
+    )
+    for shard in shards:
+        for name in shard["recipes"]:
+            assert set(deps[name]) <= set(shard["build"])
+        assert shard["args"][0] == "-r"
+        if "numpy" in shard["build"]:
+            assert "numpy==1.26.4" in shard["args"]
+            assert "numpy" not in shard["args"]
+    assert sum("numpy" in shard["build"] for shard in shards) >= 2
+
+
+def test_empty_shards_get_no_arguments():
+    shards = plan(catalog({"regex": [], "pynacl": []}), ["regex", "pynacl"], 4, None)
+    assert sorted(len(shard["args"]) for shard in shards) == [0, 0, 2, 2]
+
+
+def test_history_costs_use_median_of_slowest_arch(tmp_path):
+    path = tmp_path / "history.json"
+    for seconds in (100, 400, 110, 105, 90, 1000):
+        build_history.update(path, [("numpy", "arm64-v8a", seconds), ("numpy", "x86_64", 50)])
+    history = build_history.load(path)
+    # only the last MAX_SAMPLES runs are kept
+    assert history["numpy"]["arm64-v8a"] == [400, 110, 105, 90, 1000]
+    assert build_history.costs(history) == {"numpy": statistics.median([400, 110, 105, 90, 1000])}
+    assert build_history.costs(history, "x86_64") == {"numpy": 50}
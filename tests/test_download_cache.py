@@ -0,0 +1,142 @@
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import download_cache
+from download_cache import DownloadCache
+
+CONTENT = bytes(range(256)) * 4096  # 1 MiB
+
+
+class Upstream:
+    """A file server that honours Range unless told otherwise."""
+
+    def __init__(self, content=CONTENT):
+        self.content = content
+        self.ranges = []
+        # "range": 206 replies, "ignore": always 200, "416": reject every Range
+        self.mode = "range"
+        # cut the next N replies off after this many body bytes
+        self.truncate_at = None
+        self.truncate_count = 0
+        upstream = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                requested = self.headers.get("Range")
+                upstream.ranges.append(requested)
+                start = 0
+                if requested and upstream.mode == "416":
+                    self.send_response(416)
+                    self.send_header("Content-Range", f"bytes */{len(upstream.content)}")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                if requested and upstream.mode == "range":
+                    start = int(requested.removeprefix("bytes=").rstrip("-"))
+                body = upstream.content[start:]
+                self.send_response(206 if start else 200)
+                if start:
+                    self.send_header("Content-Range", f"bytes {start}-{len(upstream.content) - 1}/{len(upstream.content)}")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if upstream.truncate_count:
+                    upstream.truncate_count -= 1
+                    body = body[: upstream.truncate_at]
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/pkg-1.0.tar.gz"
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    monkeypatch.setattr(download_cache.time, "sleep", lambda seconds: None)
+    server = Upstream()
+    yield server
+    server.server.shutdown()
+    server.server.server_close()
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return DownloadCache(tmp_path / "cache", retries=3, timeout=10)
+
+
+def part_of(cache, url):
+    path = cache.entry(url, "pkg-1.0.tar.gz")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return path, path.with_name(path.name + ".part")
+
+
+def test_fetch_and_reuse(upstream, cache):
+    sha256 = hashlib.sha256(CONTENT).hexdigest()
+    path = cache.fetch(upstream.url, "pkg-1.0.tar.gz", {"sha256": sha256})
+    assert path.read_bytes() == CONTENT
+    assert cache.fetch(upstream.url, "pkg-1.0.tar.gz", {"sha256": sha256}) == path
+    assert upstream.ranges == [None]
+
+
+def test_cut_connection_resumes_with_range(upstream, cache):
+    upstream.truncate_at = 300_000
+    upstream.truncate_count = 1
+    path = cache.fetch(upstream.url, "pkg-1.0.tar.gz")
+    assert path.read_bytes() == CONTENT
+    assert upstream.ranges == [None, "bytes=300000-"]
+
+
+def test_existing_part_is_resumed(upstream, cache):
+    _, part = part_of(cache, upstream.url)
+    part.write_bytes(CONTENT[:1000])
+    path = cache.fetch(upstream.url, "pkg-1.0.tar.gz")
+    assert path.read_bytes() == CONTENT
+    assert upstream.ranges == ["bytes=1000-"]
+    assert not part.exists()
+
+
+def test_full_reply_to_range_restarts(upstream, cache):
+    upstream.mode = "ignore"
+    _, part = part_of(cache, upstream.url)
+    part.write_bytes(b"stale bytes from another version")
+    path = cache.fetch(upstream.url, "pkg-1.0.tar.gz")
+    assert path.read_bytes() == CONTENT
+    assert upstream.ranges == ["bytes=32-"]
+
+
+def test_416_drops_the_part_file(upstream, cache):
+    upstream.mode = "416"
+    _, part = part_of(cache, upstream.url)
+    part.write_bytes(CONTENT + b"longer than the file")
+    path = cache.fetch(upstream.url, "pkg-1.0.tar.gz")
+    assert path.read_bytes() == CONTENT
+    assert upstream.ranges == [f"bytes={len(CONTENT) + 20}-", None]
+
+
+def test_checksum_mismatch_deletes_and_raises(upstream, cache):
+    with pytest.raises(ValueError, match="sha256sum mismatch"):
+        cache.fetch(upstream.url, "pkg-1.0.tar.gz", {"sha256": "0" * 64})
+    path, part = part_of(cache, upstream.url)
+    assert not part.exists()
+    assert not path.exists()
+    assert not path.with_name(path.name + ".json").exists()
+
+
+def test_corrupt_cache_entry_is_downloaded_again(upstream, cache):
+    path = cache.fetch(upstream.url, "pkg-1.0.tar.gz")
+    path.write_bytes(b"x" * len(CONTENT))
+    assert cache.fetch(upstream.url, "pkg-1.0.tar.gz").read_bytes() == CONTENT
+    assert upstream.ranges == [None, None]
+
+
+def test_install_writes_p4a_marker(upstream, cache, tmp_path):
+    packages = tmp_path / "packages" / "pkg"
+    target = cache.install(upstream.url, packages)
+    assert target == packages / "pkg-1.0.tar.gz"
+    assert target.read_bytes() == CONTENT
+    assert (packages / ".mark-pkg-1.0.tar.gz").exists()
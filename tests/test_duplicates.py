@@ -0,0 +1,42 @@
+import zipfile
+
+from get_wheel_lib_dep import find_duplicates, scan_wheel_dir
+from synth import make_elf, wheel_filename
+
+PLATFORM = "android_24_arm64_v8a"
+
+
+def write(path, libs):
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for member, data in libs.items():
+            zf.writestr(member, data)
+    return path
+
+
+def scan(tmp_path):
+    return find_duplicates(str(tmp_path), scan_wheel_dir(str(tmp_path)))["platforms"][PLATFORM]
+
+
+def test_same_named_extension_modules_are_not_conflicts(tmp_path):
+    write(tmp_path / wheel_filename("a", "1.0", PLATFORM), {"a/_speedups.so": make_elf(["libc.so"])})
+    write(tmp_path / wheel_filename("b", "1.0", PLATFORM), {"b/_speedups.so": make_elf(["libm.so"])})
+    assert scan(tmp_path) == {"identical": [], "conflicts": [], "redundant_bytes": 0}
+
+
+def test_different_builds_of_one_soname_conflict(tmp_path):
+    write(tmp_path / wheel_filename("a", "1.0", PLATFORM), {"a/.libs/libssl.so": make_elf(["libc.so"], "libssl.so")})
+    write(tmp_path / wheel_filename("b", "1.0", PLATFORM), {"b/.libs/libssl.so": make_elf(["libm.so"], "libssl.so")})
+    (conflict,) = scan(tmp_path)["conflicts"]
+    assert conflict["soname"] == "libssl.so"
+    assert len(conflict["builds"]) == 2
+
+
+def test_identical_copies_without_soname_are_reported(tmp_path):
+    lib = make_elf(["libc.so"], size=4096)
+    write(tmp_path / wheel_filename("a", "1.0", PLATFORM), {"a/_shared.so": lib})
+    write(tmp_path / wheel_filename("b", "1.0", PLATFORM), {"b/_shared.so": lib})
+    platform = scan(tmp_path)
+    (group,) = platform["identical"]
+    assert group["soname"] is None
+    assert group["redundant_bytes"] == len(lib)
+    assert platform["conflicts"] == []
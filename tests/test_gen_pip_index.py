@@ -0,0 +1,113 @@
+import hashlib
+import json
+import zipfile
+from html.parser import HTMLParser
+from pathlib import Path
+
+import pytest
+
+import gen_pip_index
+from synth import wheel_filename, write_wheel, write_wheel_dir
+
+
+class Links(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.links = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "a":
+            self.links.append(dict(attrs))
+
+    def handle_data(self, data):
+        if self.links and "text" not in self.links[-1]:
+            self.links[-1]["text"] = data
+
+
+def parse_links(path: Path) -> list[dict]:
+    parser = Links()
+    parser.feed(path.read_text(encoding="utf-8"))
+    return parser.links
+
+
+@pytest.fixture
+def wheel_root(tmp_path):
+    root = tmp_path / "wheels"
+    write_wheel_dir(root, 6, members=3, member_size=64, libs=1, lib_size=0)
+    write_wheel(root / wheel_filename("pkg0000", "2.0", "android_24_x86_64"), "pkg0000", "2.0", members=2)
+    # no METADATA: index.html has no data-dist-info-metadata, JSON says false
+    with zipfile.ZipFile(root / wheel_filename("bare", "0.1", "android_24_arm"), "w") as zf:
+        zf.writestr("bare/__init__.py", "")
+    return root
+
+
+@pytest.mark.parametrize("base_url", [None, "https://example.invalid/download/1.0"])
+def test_html_and_json_agree(tmp_path, wheel_root, base_url):
+    out = tmp_path / "docs"
+    gen_pip_index.main(wheel_root, base_url, out)
+    p4a = out / "p4a"
+
+    projects = json.loads((p4a / "index.json").read_text())["projects"]
+    landing = [link["href"].rstrip("/") for link in parse_links(p4a / "index.html")]
+    assert [p["name"] for p in projects] == landing == ["bare", "pkg0000", "pkg0001"]
+
+    for pkg in landing:
+        doc = json.loads((p4a / pkg / "index.json").read_text())
+        links = parse_links(p4a / pkg / "index.html")
+        assert doc["name"] == pkg
+        assert [f["filename"] for f in doc["files"]] == [link["text"] for link in links]
+        for file, link in zip(doc["files"], links):
+            url, _, fragment = link["href"].partition("#")
+            assert url == file["url"]
+            assert fragment == f"sha256={file['hashes']['sha256']}"
+            wheel = wheel_root / file["filename"]
+            assert file["hashes"]["sha256"] == hashlib.sha256(wheel.read_bytes()).hexdigest()
+            assert file["size"] == wheel.stat().st_size
+
+            metadata = link.get("data-dist-info-metadata")
+            if file["core-metadata"] is False:
+                assert metadata is None
+                assert not (wheel_root / (file["filename"] + ".metadata")).exists()
+            else:
+                assert metadata == f"sha256={file['core-metadata']['sha256']}"
+                assert file["dist-info-metadata"] == file["core-metadata"]
+                sidecar = wheel_root / (file["filename"] + ".metadata")
+                assert hashlib.sha256(sidecar.read_bytes()).hexdigest() == file["core-metadata"]["sha256"]
+
+    assert json.loads((p4a / "pkg0000" / "index.json").read_text())["versions"] == ["1.0", "2.0"]
+
+
+def test_all_json_matches_project_pages(tmp_path, wheel_root):
+    out = tmp_path / "docs"
+    gen_pip_index.main(wheel_root, None, out)
+    p4a = out / "p4a"
+    combined = json.loads((p4a / "all.json").read_text())["projects"]
+    for pkg, project in combined.items():
+        doc = json.loads((p4a / pkg / "index.json").read_text())
+        assert project["versions"] == doc["versions"]
+        for file, page_file in zip(project["files"], doc["files"], strict=True):
+            # all.json sits in p4a/, one level above the project pages
+            assert file["url"] == f"{pkg}/{page_file['url']}"
+            assert {**file, "url": page_file["url"]} == page_file
+
+
+@pytest.mark.parametrize("full", [False, True])
+def test_removed_wheel_loses_its_sidecar(tmp_path, wheel_root, full):
+    out = tmp_path / "docs"
+    gen_pip_index.main(wheel_root, None, out)
+    gone = wheel_root / wheel_filename("pkg0001", "1.0", "android_24_arm")
+    sidecar = wheel_root / (gone.name + ".metadata")
+    assert sidecar.is_file()
+    # left behind by an older version that compressed sidecars
+    (wheel_root / (sidecar.name + ".gz")).write_bytes(b"")
+    gone.unlink()
+
+    gen_pip_index.main(wheel_root, None, out, full=full)
+
+    assert not sidecar.exists()
+    assert not (wheel_root / (sidecar.name + ".gz")).exists()
+    assert sorted(p.name for p in wheel_root.glob("*.metadata")) == sorted(
+        p.name + ".metadata" for p in wheel_root.glob("*.whl") if p.name != wheel_filename("bare", "0.1", "android_24_arm")
+    )
+    hashes = json.loads((wheel_root / ".p4a-hashes.json").read_text())["files"]
+    assert gone.name not in hashes and sidecar.name not in hashes
@@ -0,0 +1,197 @@
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from release import HttpBackend, HttpError
+
+REPO = "owner/wheels"
+TAG = "1.2"
+
+
+class FakeGitHub:
+    """Just enough of the releases API for HttpBackend, with scripted failures."""
+
+    def __init__(self, assets=(), page_size=30):
+        self.assets = {name: {"id": i, "name": name, "digest": ""} for i, name in enumerate(assets, 1)}
+        self.next_id = len(self.assets) + 1
+        self.page_size = page_size
+        self.uploads = {}
+        self.requests = []
+        # (method, path prefix) -> list of (status, headers, body) served first
+        self.failures = {}
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self.handler())
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        self.thread = threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True)
+
+    def fail(self, method, prefix, *responses):
+        self.failures.setdefault((method, prefix), []).extend(responses)
+
+    def handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def reply(self, status, body=b"", headers=()):
+                if not isinstance(body, bytes):
+                    body = json.dumps(body).encode()
+                self.send_response(status)
+                for key, value in headers:
+                    self.send_header(key, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def handle_one(self, method):
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                with fake.lock:
+                    fake.requests.append((method, self.path))
+                    for (m, prefix), queue in fake.failures.items():
+                        if m == method and self.path.startswith(prefix) and queue:
+                            return self.reply(*queue.pop(0))
+                    return self.route(method, body)
+
+            def route(self, method, body):
+                path, _, query = self.path.partition("?")
+                params = dict(p.split("=", 1) for p in query.split("&") if p)
+                if method == "GET" and path == f"/repos/{REPO}/releases/tags/{TAG}":
+                    return self.reply(200, {"id": 7, "upload_url": f"{fake.url}/upload/7/assets{{?name,label}}"})
+                if method == "GET" and path == f"/repos/{REPO}/releases/7/assets":
+                    per_page = min(int(params.get("per_page", 30)), fake.page_size)
+                    page = int(params.get("page", 1))
+                    assets = sorted(fake.assets.values(), key=lambda a: a["id"])
+                    headers = []
+                    if page * per_page < len(assets):
+                        next_url = f"{fake.url}{path}?per_page={per_page}&page={page + 1}"
+                        headers.append(("Link", f'<{next_url}>; rel="next", <{fake.url}{path}?page=1>; rel="first"'))
+                    return self.reply(200, assets[(page - 1) * per_page : page * per_page], headers)
+                match = re.fullmatch(rf"/repos/{REPO}/releases/assets/(\d+)", path)
+                if method == "DELETE" and match:
+                    for name, asset in list(fake.assets.items()):
+                        if asset["id"] == int(match.group(1)):
+                            del fake.assets[name]
+                            return self.reply(204)
+                    return self.reply(404, {"message": "Not Found"})
+                if method == "POST" and path == "/upload/7/assets":
+                    name = params["name"]
+                    if name in fake.assets:
+                        return self.reply(422, {"message": "Validation Failed", "errors": [{"code": "already_exists"}]})
+                    fake.assets[name] = {"id": fake.next_id, "name": name, "digest": ""}
+                    fake.next_id += 1
+                    fake.uploads[name] = body
+                    return self.reply(201, fake.assets[name])
+                return self.reply(404, {"message": "Not Found"})
+
+            def do_GET(self):
+                self.handle_one("GET")
+
+            def do_POST(self):
+                self.handle_one("POST")
+
+            def do_DELETE(self):
+                self.handle_one("DELETE")
+
+        return Handler
+
+
+@pytest.fixture
+def github():
+    fakes = []
+
+    def start(**kwargs):
+        fake = FakeGitHub(**kwargs)
+        fake.thread.start()
+        fakes.append(fake)
+        return fake
+
+    yield start
+    for fake in fakes:
+        fake.server.shutdown()
+        fake.server.server_close()
+
+
+def backend(fake, retries=3):
+    return HttpBackend(REPO, TAG, "token", api_url=fake.url, retries=retries, backoff=0)
+
+
+def test_list_assets_follows_link_pagination(github):
+    names = [f"pkg{i:03d}-1.0-py3-none-any.whl" for i in range(250)]
+    fake = github(assets=names, page_size=100)
+    assets = backend(fake).list_assets()
+    assert sorted(assets) == sorted(names)
+    pages = [path for method, path in fake.requests if "/releases/7/assets" in path]
+    assert len(pages) == 3
+
+
+def test_upload_streams_file(github, tmp_path):
+    fake = github()
+    client = backend(fake)
+    client.list_assets()
+    wheel = tmp_path / "new-1.0-py3-none-any.whl"
+    wheel.write_bytes(bytes(range(256)) * 8192)
+    client.upload_asset(wheel)
+    assert fake.uploads[wheel.name] == wheel.read_bytes()
+
+
+def test_upload_replaces_asset_that_already_exists(github, tmp_path):
+    wheel = tmp_path / "pkg-1.0-py3-none-any.whl"
+    wheel.write_bytes(b"new contents")
+    fake = github(assets=[wheel.name])
+    client = backend(fake)
+    client.list_assets()
+    client.upload_asset(wheel)
+    assert fake.uploads[wheel.name] == b"new contents"
+    methods = [method for method, _ in fake.requests]
+    # POST (422), list again, DELETE the old asset, POST again
+    assert methods[-3:] == ["GET", "DELETE", "POST"]
+    assert methods.count("POST") == 2
+
+
+@pytest.mark.parametrize(
+    "status, headers, body",
+    [
+        (403, [("x-ratelimit-remaining", "0"), ("retry-after", "0")], {"message": "API rate limit exceeded"}),
+        (403, [], {"message": "You have exceeded a secondary rate limit"}),
+        (429, [("retry-after", "0")], {"message": "Too Many Requests"}),
+        (502, [], b"bad gateway"),
+    ],
+)
+def test_rate_limits_and_server_errors_are_retried(github, status, headers, body):
+    fake = github(assets=["a.whl"])
+    fake.fail("GET", f"/repos/{REPO}/releases/tags/", (status, body, headers), (status, body, headers))
+    assert list(backend(fake).list_assets()) == ["a.whl"]
+    tags = [path for _, path in fake.requests if "/releases/tags/" in path]
+    assert len(tags) == 3
+
+
+def test_retries_give_up(github):
+    fake = github()
+    limited = (429, {"message": "Too Many Requests"}, [("retry-after", "0")])
+    fake.fail("GET", f"/repos/{REPO}/releases/tags/", *[limited] * 3)
+    with pytest.raises(HttpError, match="HTTP 429"):
+        backend(fake, retries=2).list_assets()
+
+
+def test_forbidden_without_rate_limit_is_not_retried(github):
+    fake = github()
+    fake.fail("GET", f"/repos/{REPO}/releases/tags/", (403, {"message": "Resource not accessible by integration"}, []))
+    with pytest.raises(HttpError, match="HTTP 403"):
+        backend(fake).list_assets()
+    assert len(fake.requests) == 1
+
+
+def test_delete_ignores_assets_that_are_already_gone(github):
+    fake = github(assets=["a.whl", "b.whl"])
+    client = backend(fake)
+    client.list_assets()
+    del fake.assets["a.whl"]
+    client.delete_asset("a.whl")
+    client.delete_asset("b.whl")
+    assert fake.assets == {}
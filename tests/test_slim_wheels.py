@@ -0,0 +1,56 @@
+import csv
+import io
+import zipfile
+
+from slim_wheels import DEFAULT_EXCLUDES, TEST_EXCLUDES, record_hash, slim_wheel
+
+MEMBERS = {
+    "pkg/__init__.py": b"from pkg import test\n",
+    "pkg/odd,name.py": b"x = 1\n",
+    'pkg/"quoted".py': b"y = 2\n",
+    "pkg/test/__init__.py": b"def run(): pass\n",
+    "pkg/include/pkg.h": b"int f(void);\n",
+    "pkg/__pycache__/mod.cpython-314.pyc": b"\0" * 16,
+    "pkg-1.0.dist-info/METADATA": b"Metadata-Version: 2.1\nName: pkg\nVersion: 1.0\n",
+    "pkg-1.0.dist-info/RECORD": b"stale\n",
+}
+
+
+def make_wheel(tmp_path):
+    whl = tmp_path / "pkg-1.0-cp314-cp314-android_24_arm64_v8a.whl"
+    with zipfile.ZipFile(whl, "w") as zf:
+        for name, data in MEMBERS.items():
+            zf.writestr(name, data)
+    return whl
+
+
+def read_record(whl):
+    with zipfile.ZipFile(whl) as zf:
+        rows = list(csv.reader(io.StringIO(zf.read("pkg-1.0.dist-info/RECORD").decode())))
+        return rows, {name: zf.read(name) for name in zf.namelist()}
+
+
+def test_default_excludes_keep_test_packages(tmp_path):
+    whl = make_wheel(tmp_path)
+    _, _, dropped, _ = slim_wheel(whl, None, DEFAULT_EXCLUDES, 9)
+    rows, contents = read_record(whl)
+    assert dropped == 2
+    assert "pkg/include/pkg.h" not in contents
+    assert "pkg/__pycache__/mod.cpython-314.pyc" not in contents
+    assert "pkg/test/__init__.py" in contents
+
+    assert rows[-1] == ["pkg-1.0.dist-info/RECORD", "", ""]
+    listed = {name: (digest, size) for name, digest, size in rows[:-1]}
+    assert set(listed) == set(contents) - {"pkg-1.0.dist-info/RECORD"}
+    for name, (digest, size) in listed.items():
+        assert digest == record_hash(contents[name])
+        assert int(size) == len(contents[name])
+    assert "pkg/odd,name.py" in listed and 'pkg/"quoted".py' in listed
+
+
+def test_drop_tests_is_opt_in(tmp_path):
+    whl = make_wheel(tmp_path)
+    slim_wheel(whl, None, DEFAULT_EXCLUDES + TEST_EXCLUDES, 9)
+    _, contents = read_record(whl)
+    assert "pkg/test/__init__.py" not in contents
+    assert "pkg/__init__.py" in contents
@@ -0,0 +1,70 @@
+"""SHA-256 digests of wheel directory files, shared between scripts.
+
+gen_pip_index.py hashes every wheel (and ``.whl.metadata`` sidecar) it
+indexes and stores the digests in ``<wheel_dir>/.p4a-hashes.json``.
+release.py reads the same file, only rehashes files whose size or mtime
+changed since, and records what it hashed, so a wheel is hashed once per
+build and not again on later release runs.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+HASHES_NAME = ".p4a-hashes.json"
+HASHES_VERSION = 1
+HASH_BUFFER_SIZE = 1024 * 1024
+
+
+def sha256_file(path: Path) -> str:
+    """Hash a file through a fixed-size buffer, never reading it whole."""
+    hasher = hashlib.sha256()
+    buf = bytearray(HASH_BUFFER_SIZE)
+    view = memoryview(buf)
+    with path.open("rb", buffering=0) as f:
+        while n := f.readinto(buf):
+            hasher.update(view[:n])
+    return hasher.hexdigest()
+
+
+def load(wheel_dir: Path) -> dict:
+    """Return ``{filename: {"size", "mtime_ns", "sha256"}}`` for ``wheel_dir``."""
+    try:
+        data = json.loads((wheel_dir / HASHES_NAME).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, dict) or data.get("version") != HASHES_VERSION:
+        return {}
+    return data.get("files", {})
+
+
+def lookup(records: dict, path: Path) -> str | None:
+    """Return the recorded digest of ``path`` if the file is unchanged since."""
+    record = records.get(path.name)
+    if record is None:
+        return None
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    if record.get("size") != st.st_size or record.get("mtime_ns") != st.st_mtime_ns:
+        return None
+    return record.get("sha256")
+
+
+def record(records: dict, path: Path, digest: str, st: os.stat_result | None = None) -> None:
+    st = st or path.stat()
+    records[path.name] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": digest}
+
+
+def save(wheel_dir: Path, records: dict) -> None:
+    """Write ``records`` back, dropping entries for files that no longer exist."""
+    files = {name: rec for name, rec in sorted(records.items()) if (wheel_dir / name).is_file()}
+    path = wheel_dir / HASHES_NAME
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_text(
+        json.dumps({"version": HASHES_VERSION, "files": files}, indent=1) + "\n",
+        encoding="utf-8",
+    )
+    os.replace(tmp_path, path)
@@ -0,0 +1,288 @@
+"""Read everything the index, scan and release tools need from a wheel at once.
+
+``inspect_wheel`` walks the archive front to back through its local file
+headers, so the file is read from disk exactly once: every block feeds the
+full-file SHA-256, METADATA and ``.so`` members are decompressed as they pass
+by, and everything else is skipped without decompressing. Archives that
+cannot be walked that way (data descriptors, zip64, unusual compression) are
+hashed in the same pass and then read through zipfile.
+"""
+
+import hashlib
+import os
+import struct
+import zipfile
+import zlib
+from functools import lru_cache
+from pathlib import Path
+
+from packaging.utils import parse_wheel_filename
+
+ELF_MAGIC = b"\x7fELF"
+ELFCLASS32, ELFCLASS64 = 1, 2
+ELFDATA2LSB, ELFDATA2MSB = 1, 2
+PT_LOAD, PT_DYNAMIC = 1, 2
+DT_NULL, DT_NEEDED, DT_STRTAB, DT_SONAME, DT_RPATH, DT_RUNPATH = 0, 1, 5, 14, 15, 29
+
+# (e_phoff, e_phentsize, e_phnum) offsets, program header and dynamic entry
+# layouts, keyed by ELF class. Endianness is prepended at parse time.
+_ELF_LAYOUT = {
+    ELFCLASS32: ((28, "I"), 42, 44, "8I", (0, 1, 2, 4), "iI"),
+    ELFCLASS64: ((32, "Q"), 54, 56, "2I6Q", (0, 2, 3, 5), "qQ"),
+}
+
+_LOCAL_HEADER = struct.Struct("<4s5H3L2H")
+_LOCAL_SIG = b"PK\x03\x04"
+_EOCD = struct.Struct("<4s4H2LH")
+_EOCD_SIG = b"PK\x05\x06"
+READ_BLOCK_SIZE = 1024 * 1024
+
+
+def parse_elf_dynamic(data) -> dict | None:
+    """Read DT_NEEDED, DT_SONAME and DT_RUNPATH from an in-memory ELF image.
+
+    Works on 32/64-bit objects of either endianness by following PT_DYNAMIC
+    and mapping DT_STRTAB back to a file offset through the PT_LOAD segments,
+    so stripped libraries without section headers are handled too. Returns
+    None if ``data`` is not a usable ELF file.
+    """
+    data = memoryview(data)
+    if bytes(data[:4]) != ELF_MAGIC:
+        return None
+    try:
+        layout = _ELF_LAYOUT[data[4]]
+        endian = {ELFDATA2LSB: "<", ELFDATA2MSB: ">"}[data[5]]
+    except (IndexError, KeyError):
+        return None
+    (phoff_at, phoff_fmt), phentsize_at, phnum_at, phdr_fmt, phdr_fields, dyn_fmt = layout
+    try:
+        (phoff,) = struct.unpack_from(endian + phoff_fmt, data, phoff_at)
+        (phentsize,) = struct.unpack_from(endian + "H", data, phentsize_at)
+        (phnum,) = struct.unpack_from(endian + "H", data, phnum_at)
+
+        phdr = struct.Struct(endian + phdr_fmt)
+        type_i, offset_i, vaddr_i, filesz_i = phdr_fields
+        loads = []
+        dynamic = None
+        for i in range(phnum):
+            fields = phdr.unpack_from(data, phoff + i * phentsize)
+            segment = (fields[vaddr_i], fields[offset_i], fields[filesz_i])
+            if fields[type_i] == PT_LOAD:
+                loads.append(segment)
+            elif fields[type_i] == PT_DYNAMIC:
+                dynamic = segment
+        if dynamic is None:
+            return {"needed": [], "soname": None, "runpath": None}
+
+        _, dyn_offset, dyn_size = dynamic
+        entries = []
+        strtab = None
+        for tag, value in struct.iter_unpack(endian + dyn_fmt, data[dyn_offset : dyn_offset + dyn_size]):
+            if tag == DT_NULL:
+                break
+            if tag == DT_STRTAB:
+                strtab = value
+            elif tag in (DT_NEEDED, DT_SONAME, DT_RPATH, DT_RUNPATH):
+                entries.append((tag, value))
+
+        strtab_offset = next(
+            (offset + strtab - vaddr for vaddr, offset, size in loads if vaddr <= strtab < vaddr + size),
+            None,
+        )
+        if strtab_offset is None:
+            return None
+
+        def string_at(index):
+            start = strtab_offset + index
+            end = bytes(data[start : start + 4096]).index(b"\0")
+            return bytes(data[start : start + end]).decode("utf-8", "replace")
+
+        info = {"needed": [], "soname": None, "runpath": None}
+        for tag, value in entries:
+            if tag == DT_NEEDED:
+                info["needed"].append(string_at(value))
+            elif tag == DT_SONAME:
+                info["soname"] = string_at(value)
+            elif tag == DT_RUNPATH or (tag == DT_RPATH and info["runpath"] is None):
+                # DT_RUNPATH supersedes the legacy DT_RPATH when both exist.
+                info["runpath"] = string_at(value)
+        return info
+    except (struct.error, ValueError):
+        return None
+
+
+@lru_cache(maxsize=None)
+def wheel_tags(filename: str) -> dict:
+    """Name, version, build tag and sorted platform tags from a wheel filename."""
+    name, version, build, tags = parse_wheel_filename(filename)
+    return {
+        "name": str(name),
+        "version": str(version),
+        "build": build[1] if build else None,
+        "platforms": sorted({tag.platform for tag in tags}),
+    }
+
+
+def lib_key(crc: int, size: int) -> str:
+    """Content key of a zip member; the same as elf_cache.ElfCache.key."""
+    return f"{crc:08x}-{size}"
+
+
+class _Unstreamable(Exception):
+    """The local headers alone do not describe the archive."""
+
+
+class _HashingReader:
+    """Sequential reads that feed every byte to ``hasher`` on the way."""
+
+    def __init__(self, f, hasher):
+        self.f = f
+        self.hasher = hasher
+        self.buf = bytearray(READ_BLOCK_SIZE)
+        self.view = memoryview(self.buf)
+
+    def read(self, n: int) -> bytes:
+        data = self.f.read(n)
+        if self.hasher is not None:
+            self.hasher.update(data)
+        return data
+
+    def skip(self, n: int) -> None:
+        if self.hasher is None:
+            self.f.seek(n, os.SEEK_CUR)
+            return
+        while n > 0:
+            got = self.f.readinto(self.view[: min(n, READ_BLOCK_SIZE)])
+            if not got:
+                raise _Unstreamable("truncated member")
+            self.hasher.update(self.view[:got])
+            n -= got
+
+    def drain(self) -> bytes:
+        """Read to the end of the file, returning the last block."""
+        tail = b""
+        while data := self.read(READ_BLOCK_SIZE):
+            tail = (tail + data)[-(_EOCD.size + 0xFFFF) :]
+        return tail
+
+
+def _is_metadata(name: str) -> bool:
+    parts = name.split("/")
+    return len(parts) == 2 and parts[0].endswith(".dist-info") and parts[1] == "METADATA"
+
+
+def _wants_lib(name: str, lib_members) -> bool:
+    return name.endswith(".so") if lib_members is None else name in lib_members
+
+
+def _stream_members(reader: _HashingReader, lib_members, result: dict, preferred: str) -> None:
+    """Walk the local headers; fills ``result`` and leaves ``reader`` at the central directory."""
+    count = 0
+    while True:
+        head = reader.read(_LOCAL_HEADER.size)
+        if head[:4] != _LOCAL_SIG:
+            result["_rest"] = head
+            break
+        if len(head) < _LOCAL_HEADER.size:
+            raise _Unstreamable("truncated local header")
+        _, _, flags, method, _, _, crc, comp_size, size, name_len, extra_len = _LOCAL_HEADER.unpack(head)
+        name = reader.read(name_len).decode("cp437" if not flags & 0x800 else "utf-8")
+        reader.skip(extra_len)
+        if flags & 0x9 or comp_size == 0xFFFFFFFF or size == 0xFFFFFFFF:
+            # data descriptor, encryption or zip64: sizes are not in this header
+            raise _Unstreamable(name)
+        count += 1
+        want_metadata = _is_metadata(name) and (result["metadata"] is None or name == preferred)
+        want_lib = _wants_lib(name, lib_members)
+        if not (want_metadata or want_lib):
+            reader.skip(comp_size)
+            continue
+        data = reader.read(comp_size)
+        if method == zipfile.ZIP_DEFLATED:
+            data = zlib.decompress(data, -zlib.MAX_WBITS)
+        elif method != zipfile.ZIP_STORED:
+            raise _Unstreamable(name)
+        if zlib.crc32(data) != crc:
+            raise _Unstreamable(f"{name}: CRC mismatch")
+        if want_metadata:
+            result["metadata"] = data
+        if want_lib:
+            info = parse_elf_dynamic(data)
+            if info is not None:
+                result["libs"][name] = info
+                result["lib_keys"][name] = lib_key(crc, size)
+    result["members"] = count
+
+
+def _read_with_zipfile(path: Path, lib_members, result: dict, preferred: str) -> None:
+    with zipfile.ZipFile(path) as zf:
+        infos = zf.infolist()
+        result["members"] = len(infos)
+        names = [i.filename for i in infos if _is_metadata(i.filename)]
+        if names:
+            result["metadata"] = zf.read(preferred if preferred in names else names[0])
+        for info in infos:
+            if not info.is_dir() and _wants_lib(info.filename, lib_members):
+                elf = parse_elf_dynamic(zf.read(info))
+                if elf is not None:
+                    result["libs"][info.filename] = elf
+                    result["lib_keys"][info.filename] = lib_key(info.CRC, info.file_size)
+
+
+def inspect_wheel(path, lib_members=None, hash_file: bool = True) -> dict:
+    """Inspect one wheel in a single read.
+
+    Returns a dict with the filename ``tags`` (see wheel_tags), ``size`` and
+    ``mtime_ns`` (from before the read), the full-file ``sha256`` (None with
+    ``hash_file=False``), the number of ``members``, the ``metadata`` bytes
+    and ``metadata_sha256`` (None without a METADATA file), and the dynamic
+    info of every ``.so`` member (or only ``lib_members``) in ``libs`` with
+    their zip content keys in ``lib_keys``.
+
+    Raises zipfile.BadZipFile (or OSError) for unreadable wheels.
+    """
+    path = Path(path)
+    tags = wheel_tags(path.name)
+    lib_members = None if lib_members is None else set(lib_members)
+    dist, version = path.name.split("-")[:2]
+    preferred = f"{dist}-{version}.dist-info/METADATA"
+    hasher = hashlib.sha256() if hash_file else None
+    with path.open("rb") as f:
+        st = os.fstat(f.fileno())
+        result = {"metadata": None, "libs": {}, "lib_keys": {}}
+        reader = _HashingReader(f, hasher)
+        try:
+            _stream_members(reader, lib_members, result, preferred)
+            tail = result.pop("_rest") + reader.drain()
+            pos = tail.rfind(_EOCD_SIG)
+            if pos < 0 or pos + _EOCD.size > len(tail):
+                raise _Unstreamable("no end of central directory record")
+            if _EOCD.unpack_from(tail, pos)[4] != result["members"]:
+                # local entries the central directory does not list
+                raise _Unstreamable("member count mismatch")
+            streamed = True
+        except (_Unstreamable, zlib.error):
+            result.pop("_rest", None)
+            if hasher is not None:
+                f.seek(0)
+                hasher = hashlib.sha256()
+                reader = _HashingReader(f, hasher)
+                reader.drain()
+            streamed = False
+    if not streamed:
+        result = {"metadata": None, "libs": {}, "lib_keys": {}}
+        _read_with_zipfile(path, lib_members, result, preferred)
+
+    metadata = result["metadata"]
+    return {
+        "filename": path.name,
+        "tags": tags,
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "sha256": hasher.hexdigest() if hasher is not None else None,
+        "members": result["members"],
+        "metadata": metadata,
+        "metadata_sha256": hashlib.sha256(metadata).hexdigest() if metadata is not None else None,
+        "libs": result["libs"],
+        "lib_keys": result["lib_keys"],
+    }